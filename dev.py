@@ -9,96 +9,284 @@ the application when any Python file changes.
 Usage:
     python dev.py app.py
     python dev.py examples/01-hello-world/app.py
+    python dev.py --poll --poll-interval 5 app.py
+    python dev.py --in-process app.py
 """
 
-import argparse
+import fnmatch
+import functools
+import hashlib
 import importlib.util
 import os
+import selectors
 import signal
 import subprocess
 import sys
-import time
+import threading
 from pathlib import Path
 from types import ModuleType
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-try:
-    from watchdog.events import FileSystemEventHandler
-    from watchdog.observers import Observer
-except ImportError:
-    print("watchdog package is required for dev server. Install it with:")
-    print("pip install watchdog")
-    sys.exit(1)
+# Delay (in seconds) after the last change in a burst before reloading
+DEBOUNCE_DELAY = 0.2
 
-class AppReloader(FileSystemEventHandler):
+# Seconds to wait for the app to exit after SIGTERM before sending SIGKILL
+SHUTDOWN_TIMEOUT = 2.0
+
+# Start the app in a new session/process group so signals reach grandchildren
+if os.name == 'nt':
+    PROCESS_GROUP_KWARGS = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    PROCESS_GROUP_KWARGS = {'start_new_session': True}
+
+# Maximum number of bytes read from a child pipe per syscall
+PIPE_READ_SIZE = 65536
+
+# select() only accepts sockets on Windows, so child pipes get reader threads there
+SELECT_PIPES = os.name != 'nt'
+
+# Filesystem types on which native (inotify/FSEvents) watching misses events
+NETWORK_FS_TYPES = {'nfs', 'nfs4', 'cifs', 'smbfs', 'smb3', 'fuse.sshfs', '9p', 'vboxsf', 'virtiofs'}
+
+# Directory names that never contain application sources
+SKIP_DIRS = {'.git', '__pycache__', 'node_modules', '.venv', 'venv',
+             '.mypy_cache', '.pytest_cache', '.tox', 'build', 'dist'}
+
+@functools.lru_cache(maxsize=None)
+def read_mounts() -> Tuple[Tuple[str, str], ...]:
+    """Read (mount point, filesystem type) pairs from /proc/mounts once."""
+    try:
+        with open('/proc/mounts', 'r') as f:
+            return tuple(tuple(line.split()[1:3]) for line in f)
+    except OSError:
+        return ()
+
+def is_network_mount(path: str) -> bool:
+    """Check whether a path lives on a network filesystem (Linux only)."""
+    mounts = read_mounts()
+    if not mounts:
+        return False
+    
+    # Find the longest mount point containing the path
+    path = os.path.realpath(path)
+    best_match, best_type = '', None
+    for mount_point, fs_type in mounts:
+        mount_point = mount_point.replace('\\040', ' ')
+        prefix = mount_point.rstrip('/') + '/'
+        if (path == mount_point or path.startswith(prefix)) and len(mount_point) > len(best_match):
+            best_match, best_type = mount_point, fs_type
+    
+    return best_type in NETWORK_FS_TYPES
+
+# Only Python sources trigger reloads; everything else is dropped by the dispatcher
+WATCH_PATTERNS = ['*.py']
+IGNORE_PATTERNS = ['*/__pycache__/*', '*/.git/*', '*/.*', '*/venv/*', '*/.venv/*']
+
+class AppReloader:
     """Watches for file changes and reloads the application."""
     
-    def __init__(self, app_path: str, watch_dirs: List[str] = None):
+    def __init__(self, app_path: str, watch_dirs: List[str] = None,
+                 poll: bool = False, poll_interval: float = 2.0, in_process: bool = False):
+        # Imported lazily so `dev.py --help` and startup don't pay for watchdog
+        try:
+            from watchdog.events import FileSystemEventHandler, PatternMatchingEventHandler
+            from watchdog.observers import Observer
+            from watchdog.observers.polling import PollingObserver
+        except ImportError:
+            print("watchdog package is required for dev server. Install it with:")
+            print("pip install watchdog")
+            sys.exit(1)
+        
+        self.event_handler = PatternMatchingEventHandler(
+            patterns=WATCH_PATTERNS, ignore_patterns=IGNORE_PATTERNS, ignore_directories=True
+        )
+        self.event_handler.on_modified = self.on_modified
+        # Watches are non-recursive, so directories created later are added by hand
+        self.dir_handler = FileSystemEventHandler()
+        self.dir_handler.on_created = self.on_dir_created
+        self.dir_handler.on_moved = self.on_dir_created
         self.app_path = app_path
-        self.watch_dirs = watch_dirs or ['.']
+        self.watch_dirs = watch_dirs or scan_source_dirs('.')
+        self.in_process = in_process
         self.process: Optional[subprocess.Popen] = None
-        self.observer = Observer()
+        
+        # Native observers miss events on network mounts, so poll there instead
+        if not poll and any(is_network_mount(d) for d in self.watch_dirs):
+            print("🌐 Network filesystem detected, falling back to polling")
+            poll = True
+        self.observer = PollingObserver(timeout=poll_interval) if poll else Observer()
         self.module_name = os.path.basename(app_path).replace('.py', '')
         self.module: Optional[ModuleType] = None
-        self.last_reload = 0
-        self.reloading = False
+        self._debounce_timer: Optional[threading.Timer] = None
+        self._pending_paths = set()
+        self._stat_cache: Dict[str, Tuple[int, int]] = {}
+        self._hash_cache: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        
+        # Reloads run on one worker thread so the watchdog thread never blocks;
+        # setting the event while a reload is in flight coalesces into one more
+        self._reload_event = threading.Event()
+        self._reload_worker = threading.Thread(target=self.reload_worker, name='reloader')
+        self._reload_worker.daemon = True
+        
+        # Single selector multiplexing the child's stdout/stderr, plus a
+        # self-pipe so other threads can wake the loop after re-registering
+        self._selector = None
+        if SELECT_PIPES:
+            self._selector = selectors.DefaultSelector()
+            self._wakeup_r, self._wakeup_w = os.pipe()
+            self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
         
-        # Handle SIGINT (Ctrl+C) gracefully
-        signal.signal(signal.SIGINT, self.handle_sigint)
+        # Handle SIGINT (Ctrl+C) and SIGTERM (docker stop, kubectl delete) gracefully
+        signal.signal(signal.SIGINT, self.handle_signal)
+        signal.signal(signal.SIGTERM, self.handle_signal)
             
     def start(self):
         """Start the development server with hot reloading."""
         print(f"🔥 Expressify development server starting...")
         print(f"📁 Application: {self.app_path}")
         
-        # Start watching for file changes
+        # Start watching for file changes; directories were enumerated up front
+        # so each one gets a single non-recursive watch
         for watch_dir in self.watch_dirs:
-            self.observer.schedule(self, watch_dir, recursive=True)
+            self.watch_dir(watch_dir)
         self.observer.start()
+        self.prime_hash_cache()
+        self._reload_worker.start()
         
         try:
             self.load_app()
-            while True:
-                time.sleep(1)
+            if self._selector is None:
+                # Reader threads print the output, just wait for the observer
+                self.observer.join()
+            # Pump child output until the observer is stopped
+            while self.observer.is_alive():
+                self.pump_output()
         except KeyboardInterrupt:
             self.stop()
     
     def stop(self):
         """Stop the reloader and clean up resources."""
         print("\n🛑 Shutting down development server...")
+        with self._lock:
+            if self._debounce_timer:
+                self._debounce_timer.cancel()
+                self._debounce_timer = None
         if self.process:
             self.kill_process()
         self.observer.stop()
         self.observer.join()
+        self.wakeup()
         print("👋 Server stopped")
         
-    def handle_sigint(self, sig, frame):
-        """Handle SIGINT (Ctrl+C) signal."""
+    def handle_signal(self, sig, frame):
+        """Handle SIGINT (Ctrl+C) and SIGTERM signals."""
         self.stop()
         sys.exit(0)
         
-    def on_modified(self, event):
-        """Called when a file is modified."""
-        if event.is_directory:
+    def watch_dir(self, path: str):
+        """Schedule the non-recursive source and directory watches for one directory."""
+        watch = self.observer.schedule(self.event_handler, path, recursive=False)
+        self.observer.add_handler_for_watch(self.dir_handler, watch)
+    
+    def on_dir_created(self, event):
+        """Start watching a directory created or moved into a watched one."""
+        if not event.is_directory:
             return
-            
-        # Only reload on Python file changes
-        if not event.src_path.endswith('.py'):
+        path = getattr(event, 'dest_path', None) or event.src_path
+        name = os.path.basename(path)
+        if name in SKIP_DIRS or name.endswith('.egg-info'):
             return
             
-        # Avoid multiple simultaneous reloads
-        current_time = time.time()
-        if current_time - self.last_reload < 1 or self.reloading:
+        # Subdirectories may already exist, e.g. when a package is moved in
+        for new_dir in scan_source_dirs(path):
+            # mkdir -p reports each level, which the first scan may have found
+            if new_dir in self.watch_dirs:
+                continue
+            try:
+                self.watch_dir(new_dir)
+            except OSError:
+                continue
+            self.watch_dirs.append(new_dir)
+    
+    def on_modified(self, event):
+        """Called when a Python source file is modified."""
+        path = event.src_path
+        
+        # Skip no-op saves that leave mtime and size untouched
+        try:
+            st = os.stat(path)
+            key = (st.st_mtime_ns, st.st_size)
+            if self._stat_cache.get(path) == key:
+                return
+            self._stat_cache[path] = key
+        except OSError:
+            self._stat_cache.pop(path, None)
+            
+        # Coalesce bursts of events into a single reload after the last change
+        with self._lock:
+            self._pending_paths.add(path)
+            if self._debounce_timer:
+                self._debounce_timer.cancel()
+            self._debounce_timer = threading.Timer(DEBOUNCE_DELAY, self._reload_event.set)
+            self._debounce_timer.daemon = True
+            self._debounce_timer.start()
+    
+    def reload_worker(self):
+        """Wait for reload requests and process them one at a time."""
+        while True:
+            self._reload_event.wait()
+            self._reload_event.clear()
+            self.flush_changes()
+    
+    def flush_changes(self):
+        """Reload once for all files changed during the debounce window."""
+        with self._lock:
+            changed = self._pending_paths
+            self._pending_paths = set()
+            self._debounce_timer = None
+            
+        # Formatters and `touch` rewrite files without changing their bytes
+        changed = [path for path in changed if self.content_changed(path)]
+        if not changed:
             return
             
-        self.last_reload = current_time
-        self.reloading = True
-        print(f"\n🔄 File changed: {os.path.basename(event.src_path)}")
+        # File names are only computed here, once per burst, not per event
+        for path in sorted(changed):
+            print(f"\n🔄 File changed: {path.rpartition(os.sep)[2]}")
         self.reload_app()
-        self.reloading = False
+    
+    def prime_hash_cache(self):
+        """Record content hashes of the watched sources at startup."""
+        for watch_dir in self.watch_dirs:
+            try:
+                with os.scandir(watch_dir) as entries:
+                    for entry in entries:
+                        if entry.name.endswith('.py') and entry.is_file():
+                            self.content_changed(entry.path)
+            except OSError:
+                continue
+    
+    def content_changed(self, path: str) -> bool:
+        """Hash a file and report whether it differs from the last seen content."""
+        try:
+            with open(path, 'rb') as f:
+                digest = hashlib.blake2b(f.read(), digest_size=8).digest()
+        except OSError:
+            # Deleted or unreadable files always count as a change
+            self._hash_cache.pop(path, None)
+            return True
+            
+        if self._hash_cache.get(path) == digest:
+            return False
+        self._hash_cache[path] = digest
+        return True
     
     def load_app(self):
         """Load or reload the application."""
+        if self.in_process:
+            return self.load_app_in_process()
+            
         if self.process:
             self.kill_process()
         
@@ -110,21 +298,47 @@ class AppReloader(FileSystemEventHandler):
                 [sys.executable, self.app_path],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1  # Line buffered
+                bufsize=65536,  # Binary, read in large chunks
+                # Own process group so signals also reach the app's children
+                **PROCESS_GROUP_KWARGS
             )
             
-            # Start threads to read stdout and stderr
+            # Multiplex stdout and stderr on the main thread's selector (reader threads on Windows)
             self.start_output_reader(self.process.stdout, "📤")
             self.start_output_reader(self.process.stderr, "⚠️")
+            self.wakeup()
             
         except Exception as e:
             print(f"❌ Failed to start application: {e}")
             self.process = None
     
+    def load_app_in_process(self):
+        """Run the application inside the dev server's own interpreter."""
+        print(f"🚀 Starting application in-process: {self.app_path}")
+        
+        def runner():
+            try:
+                # Execute the app file as a script so its __main__ block runs
+                sys.path.insert(0, os.path.dirname(os.path.abspath(self.app_path)))
+                spec = importlib.util.spec_from_file_location('__main__', self.app_path)
+                self.module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(self.module)
+            except Exception as e:
+                print(f"❌ Failed to start application: {e}")
+        
+        # The app's listen() serves from a daemon thread when not on the main thread
+        thread = threading.Thread(target=runner, name=self.module_name)
+        thread.daemon = True
+        thread.start()
+    
     def reload_app(self):
         """Reload the application after changes."""
         print("🔄 Reloading application...")
+        if self.in_process:
+            # Replace the process image; the kernel releases the old socket and pages
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.execv(sys.executable, [sys.executable] + sys.argv)
         self.load_app()
     
     def kill_process(self):
@@ -132,54 +346,186 @@ class AppReloader(FileSystemEventHandler):
         if self.process:
             print("🛑 Stopping current process...")
             try:
-                # Try to terminate gracefully first
-                self.process.terminate()
-                # Give it some time to terminate
-                for _ in range(5):
-                    if self.process.poll() is not None:
-                        break
-                    time.sleep(0.1)
-                    
-                # If still running, force kill
-                if self.process.poll() is None:
-                    self.process.kill()
+                # Try to terminate gracefully first, then force kill
+                self.signal_process(signal.SIGTERM)
+                try:
+                    self.process.wait(timeout=SHUTDOWN_TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    self.signal_process(getattr(signal, 'SIGKILL', signal.SIGTERM))
                     self.process.wait()
             except Exception as e:
                 print(f"❌ Error stopping process: {e}")
             
+            self.stop_output_reader(self.process.stdout)
+            self.stop_output_reader(self.process.stderr)
             self.process = None
     
+    def signal_process(self, sig):
+        """Send a signal to the subprocess and its process group."""
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(self.process.pid, sig)
+                return
+            except ProcessLookupError:
+                return
+            except OSError:
+                pass
+        self.process.send_signal(sig)
+    
     def start_output_reader(self, pipe, prefix):
-        """Start a thread to read output from the subprocess."""
-        def reader():
-            for line in iter(pipe.readline, ''):
-                if line.strip():
-                    print(f"{prefix} {line.rstrip()}")
+        """Register a subprocess pipe with the output selector, or start a thread reading it."""
+        if self._selector is not None:
+            # Partial lines are buffered until their newline arrives
+            self._selector.register(pipe, selectors.EVENT_READ, (prefix, bytearray()))
+            return
             
-        import threading
-        thread = threading.Thread(target=reader)
+        thread = threading.Thread(target=self.read_pipe, args=(pipe.fileno(), prefix))
         thread.daemon = True
         thread.start()
+    
+    def stop_output_reader(self, pipe):
+        """Unregister and close a subprocess pipe."""
+        if self._selector is not None:
+            try:
+                self._selector.unregister(pipe)
+            except (KeyError, ValueError):
+                pass
+        pipe.close()
+    
+    def read_pipe(self, fd, prefix):
+        """Print a subprocess pipe's output until it closes (reader thread)."""
+        buffer = bytearray()
+        while True:
+            try:
+                data = os.read(fd, PIPE_READ_SIZE)
+            except OSError:
+                data = b''
+            if not self.feed_output(prefix, buffer, data):
+                return
+    
+    def wakeup(self):
+        """Wake the output loop so it picks up selector changes."""
+        if self._selector is None:
+            return
+        try:
+            os.write(self._wakeup_w, b'\0')
+        except OSError:
+            pass
+    
+    def pump_output(self):
+        """Wait for output from the subprocess and print it line by line."""
+        for key, _ in self._selector.select():
+            if key.data is None:
+                os.read(self._wakeup_r, 4096)
+                continue
+                
+            prefix, buffer = key.data
+            try:
+                data = os.read(key.fd, PIPE_READ_SIZE)
+            except OSError:
+                data = b''
+                
+            if not self.feed_output(prefix, buffer, data):
+                try:
+                    self._selector.unregister(key.fileobj)
+                except (KeyError, ValueError):
+                    pass
+    
+    def feed_output(self, prefix, buffer: bytearray, data: bytes) -> bool:
+        """
+        Print the complete lines in buffer + data, keeping a trailing partial line
+        Returns False once the pipe is closed (empty data)
+        """
+        if not data:
+            # Pipe closed by the child, flush any trailing partial line
+            self.print_output(prefix, bytes(buffer))
+            return False
+            
+        buffer += data
+        end = buffer.rfind(b'\n')
+        if end != -1:
+            self.print_output(prefix, bytes(buffer[:end]))
+            del buffer[:end + 1]
+        return True
+    
+    def print_output(self, prefix, data: bytes):
+        """Print complete lines of subprocess output with a prefix."""
+        for line in data.decode('utf-8', 'replace').split('\n'):
+            if line.strip():
+                print(f"{prefix} {line.rstrip()}")
+
+def read_gitignore(root: str) -> List[str]:
+    """Read simple name patterns from a .gitignore file, if one exists."""
+    patterns = []
+    try:
+        with open(os.path.join(root, '.gitignore'), 'r') as f:
+            for line in f:
+                line = line.strip()
+                # Negations and nested paths are not supported, only names/globs
+                if not line or line.startswith(('#', '!')):
+                    continue
+                line = line.strip('/')
+                if line and '/' not in line:
+                    patterns.append(line)
+    except OSError:
+        pass
+    return patterns
+
+def scan_source_dirs(root: str) -> List[str]:
+    """Enumerate directories under root, skipping caches, VCS and virtualenvs."""
+    ignore = read_gitignore(root)
+    dirs = []
+    stack = [root]
+    
+    while stack:
+        current = stack.pop()
+        dirs.append(current)
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    name = entry.name
+                    if name in SKIP_DIRS or name.endswith('.egg-info'):
+                        continue
+                    if any(fnmatch.fnmatch(name, pattern) for pattern in ignore):
+                        continue
+                    stack.append(entry.path)
+        except OSError:
+            continue
+    
+    return dirs
 
 def find_watch_dirs(app_path: str) -> List[str]:
     """Find directories to watch for changes."""
-    app_dir = os.path.dirname(os.path.abspath(app_path))
+    app_dir = Path(app_path).resolve().parent
+    cwd = Path.cwd()
+    examples_dir = cwd / 'examples'
     
     # Always watch the directory of the app
-    watch_dirs = [app_dir]
+    watch_dirs = scan_source_dirs(str(app_dir))
     
     # If it's an examples subdirectory, also watch the core expressify package
-    if app_dir.startswith(os.path.join(os.getcwd(), 'examples')):
-        expressify_dir = os.path.join(os.getcwd(), 'expressify')
-        if os.path.exists(expressify_dir):
-            watch_dirs.append(expressify_dir)
+    # (compare path components so e.g. examples-other/ does not match)
+    if app_dir == examples_dir or examples_dir in app_dir.parents:
+        expressify_dir = cwd / 'expressify'
+        if expressify_dir.is_dir():
+            watch_dirs.extend(scan_source_dirs(str(expressify_dir)))
     
     return watch_dirs
 
 def main():
     """Main entry point for the development server."""
+    import argparse
+    
     parser = argparse.ArgumentParser(description="Expressify Development Server with Hot Reloading")
     parser.add_argument('app_path', help="Path to the main application file")
+    parser.add_argument('--poll', action='store_true',
+                        help="Use a polling observer (for NFS, CIFS or Docker bind mounts)")
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help="Polling interval in seconds when --poll is used (default: 2.0)")
+    parser.add_argument('--in-process', action='store_true',
+                        help="Run the app inside the dev server and re-exec on changes")
     args = parser.parse_args()
     
     # Ensure the app file exists
@@ -191,7 +537,8 @@ def main():
     watch_dirs = find_watch_dirs(args.app_path)
     
     # Start the reloader
-    reloader = AppReloader(args.app_path, watch_dirs)
+    reloader = AppReloader(args.app_path, watch_dirs, poll=args.poll,
+                           poll_interval=args.poll_interval, in_process=args.in_process)
     reloader.start()
 
 if __name__ == "__main__":
@@ -11,20 +11,19 @@ This example demonstrates various routing features and patterns in Expressify:
 """
 
 from expressify import expressify, Router
+import json
 import os
+import re
 
 # Create a new Expressify application
 app = expressify()
 
 # ------------------------------------------------------------
-# Basic Route Examples
+# Static Pages
 # ------------------------------------------------------------
 
-# Basic route for the root URL
-@app.get('/')
-def index(req, res):
-    """Root route - responds to GET /"""
-    res.type('text/html').send('''
+# Pages are encoded once at import instead of on every request
+INDEX_HTML = '''
     <!DOCTYPE html>
     <html>
     <head>
@@ -89,34 +88,11 @@ def index(req, res):
         </div>
     </body>
     </html>
-    ''')
-
-# Basic GET route
-@app.get('/about')
-def about(req, res):
-    """About route - responds to GET /about"""
-    res.type('text/html').send('This is the about page. <a href="/">Back to home</a>')
+    '''.encode('utf-8')
 
-# POST route to handle form submission
-@app.post('/data')
-def handle_data(req, res):
-    """Handle data - responds to POST /data"""
-    # Get the form data from the request body
-    name = req.body.get('name', 'Guest')
-    email = req.body.get('email', 'No email provided')
-    
-    # In a real application, you would do something with this data
-    res.type('application/json').json({
-        'message': 'Data received successfully!',
-        'name': name,
-        'email': email
-    })
+ABOUT_HTML = 'This is the about page. <a href="/">Back to home</a>'.encode('utf-8')
 
-# GET route for the data submission form
-@app.get('/data')
-def data_form(req, res):
-    """GET method for data form - displays a test form for POST /data"""
-    res.type('text/html').send('''
+DATA_FORM_HTML = '''
     <!DOCTYPE html>
     <html>
     <head>
@@ -183,13 +159,9 @@ def data_form(req, res):
         </script>
     </body>
     </html>
-    ''')
+    '''.encode('utf-8')
 
-# Support GET method for the update route as well (for browser testing)
-@app.get('/update')
-def update_page(req, res):
-    """GET method for update - displays a test form"""
-    res.type('text/html').send('''
+UPDATE_FORM_HTML = '''
     <!DOCTYPE html>
     <html>
     <head>
@@ -264,26 +236,9 @@ def update_page(req, res):
         </script>
     </body>
     </html>
-    ''')
-
-# PUT route to handle updates
-@app.put('/update')
-def update_data(req, res):
-    """Update data - responds to PUT /update"""
-    # In a real application, you would update a database record
-    id = req.body.get('id', 'unknown')
-    
-    res.type('application/json').json({
-        'message': f'Update request received for ID: {id}',
-        'success': True,
-        'updated_fields': {k: v for k, v in req.body.items() if k != 'id'}
-    })
+    '''.encode('utf-8')
 
-# Support GET method for the delete route as well (for browser testing)
-@app.get('/delete')
-def delete_page(req, res):
-    """GET method for delete - displays a test form"""
-    res.type('text/html').send('''
+DELETE_FORM_HTML = '''
     <!DOCTYPE html>
     <html>
     <head>
@@ -342,7 +297,69 @@ def delete_page(req, res):
         </script>
     </body>
     </html>
-    ''')
+    '''.encode('utf-8')
+
+# ------------------------------------------------------------
+# Basic Route Examples
+# ------------------------------------------------------------
+
+# Basic route for the root URL
+@app.get('/')
+def index(req, res):
+    """Root route - responds to GET /"""
+    res.type('text/html').send(INDEX_HTML)
+
+# Basic GET route
+@app.get('/about')
+def about(req, res):
+    """About route - responds to GET /about"""
+    res.type('text/html').send(ABOUT_HTML)
+
+# POST route to handle form submission
+@app.post('/data')
+def handle_data(req, res):
+    """Handle data - responds to POST /data"""
+    # Get the form data from the request body
+    name = req.body.get('name', 'Guest')
+    email = req.body.get('email', 'No email provided')
+    
+    # In a real application, you would do something with this data
+    res.json({
+        'message': 'Data received successfully!',
+        'name': name,
+        'email': email
+    })
+
+# GET route for the data submission form
+@app.get('/data')
+def data_form(req, res):
+    """GET method for data form - displays a test form for POST /data"""
+    res.type('text/html').send(DATA_FORM_HTML)
+
+# Support GET method for the update route as well (for browser testing)
+@app.get('/update')
+def update_page(req, res):
+    """GET method for update - displays a test form"""
+    res.type('text/html').send(UPDATE_FORM_HTML)
+
+# PUT route to handle updates
+@app.put('/update')
+def update_data(req, res):
+    """Update data - responds to PUT /update"""
+    # In a real application, you would update a database record
+    id = req.body.get('id', 'unknown')
+    
+    res.json({
+        'message': f'Update request received for ID: {id}',
+        'success': True,
+        'updated_fields': {k: v for k, v in req.body.items() if k != 'id'}
+    })
+
+# Support GET method for the delete route as well (for browser testing)
+@app.get('/delete')
+def delete_page(req, res):
+    """GET method for delete - displays a test form"""
+    res.type('text/html').send(DELETE_FORM_HTML)
 
 # DELETE route to handle deletion
 @app.delete('/delete')
@@ -351,7 +368,7 @@ def delete_data(req, res):
     # In a real application, you would delete a database record
     id = req.query.get('id', 'unknown')
     
-    res.type('application/json').json({
+    res.json({
         'message': f'Delete request received for ID: {id}',
         'success': True
     })
@@ -360,21 +377,37 @@ def delete_data(req, res):
 # Route Parameters Examples
 # ------------------------------------------------------------
 
+# JSON responses for the parameter routes are encoded once, each request only
+# stamps the parameter values into the placeholders
+USER_TEMPLATE = b'{"id":"$ID","name":"User $ID","email":"user$ID@example.com"}'
+PRODUCT_TEMPLATE = (b'{"category":"$CATEGORY","product":"$PRODUCT",'
+                    b'"description":"This is a $PRODUCT in the $CATEGORY category."}')
+ARTICLES_TEMPLATE = (b'{"date":"$Y-$M-$D","articles":['
+                     b'{"title":"Article 1","excerpt":"This is the first article."},'
+                     b'{"title":"Article 2","excerpt":"This is the second article."}]}')
+
+# Only values that need no JSON escaping are substituted into the templates
+SAFE_PARAM = re.compile(r'[A-Za-z0-9_-]+')
+
+def invalid_param(res, name):
+    """Reject a parameter that can't be placed in a JSON template"""
+    res.status(400).json({
+        'error': 'Invalid parameter',
+        'message': f'{name} may only contain letters, digits, underscores and hyphens',
+        'status': 400
+    })
+
 # Route with a parameter (similar to Express.js :param syntax)
 @app.get('/users/:id')
 def get_user(req, res):
     """Get a user by ID - responds to GET /users/:id"""
     # Access the URL parameter from req.params
     user_id = req.params.get('id')
+    if not SAFE_PARAM.fullmatch(user_id):
+        return invalid_param(res, 'id')
     
     # In a real app, you would fetch this from a database
-    user = {
-        'id': user_id,
-        'name': f'User {user_id}',
-        'email': f'user{user_id}@example.com'
-    }
-    
-    res.type('application/json').json(user)
+    res.type('application/json').send(USER_TEMPLATE.replace(b'$ID', user_id.encode('ascii')))
 
 # Route with multiple parameters
 @app.get('/products/:category/:product')
@@ -382,28 +415,28 @@ def get_product(req, res):
     """Get a product by category and product name"""
     category = req.params.get('category')
     product = req.params.get('product')
+    if not SAFE_PARAM.fullmatch(category):
+        return invalid_param(res, 'category')
+    if not SAFE_PARAM.fullmatch(product):
+        return invalid_param(res, 'product')
     
-    res.type('application/json').json({
-        'category': category,
-        'product': product,
-        'description': f'This is a {product} in the {category} category.'
-    })
+    res.type('application/json').send(
+        PRODUCT_TEMPLATE.replace(b'$CATEGORY', category.encode('ascii'))
+                        .replace(b'$PRODUCT', product.encode('ascii'))
+    )
 
-# Route with date parameters
-@app.get('/articles/:year/:month/:day')
+# Route with date parameters, each restricted to digits with a pattern
+@app.get(r'/articles/:year(\d{4})/:month(\d{1,2})/:day(\d{1,2})')
 def get_article_by_date(req, res):
     """Get articles by date"""
-    year = req.params.get('year')
-    month = req.params.get('month')
-    day = req.params.get('day')
+    # The route patterns only let digits through, so no further validation is needed
+    year = req.params.get('year').encode('utf-8')
+    month = req.params.get('month').encode('utf-8')
+    day = req.params.get('day').encode('utf-8')
     
-    res.type('application/json').json({
-        'date': f'{year}-{month}-{day}',
-        'articles': [
-            {'title': 'Article 1', 'excerpt': 'This is the first article.'},
-            {'title': 'Article 2', 'excerpt': 'This is the second article.'}
-        ]
-    })
+    res.type('application/json').send(
+        ARTICLES_TEMPLATE.replace(b'$Y', year).replace(b'$M', month).replace(b'$D', day)
+    )
 
 # ------------------------------------------------------------
 # Router Module Example
@@ -412,17 +445,20 @@ def get_article_by_date(req, res):
 # Create a Router instance for API routes
 api_router = Router()
 
+# Sample users, serialized once at import since the responses never change
+USERS = [
+    {'id': 1, 'name': 'Alice', 'email': 'alice@example.com'},
+    {'id': 2, 'name': 'Bob', 'email': 'bob@example.com'},
+    {'id': 3, 'name': 'Charlie', 'email': 'charlie@example.com'}
+]
+USERS_JSON = json.dumps(USERS).encode('utf-8')
+USER_JSON_BY_ID = {str(user['id']): json.dumps(user).encode('utf-8') for user in USERS}
+
 # Define routes on the router
 @api_router.get('/users')
 def get_users(req, res):
     """Get all users - responds to GET /api/users"""
-    users = [
-        {'id': 1, 'name': 'Alice', 'email': 'alice@example.com'},
-        {'id': 2, 'name': 'Bob', 'email': 'bob@example.com'},
-        {'id': 3, 'name': 'Charlie', 'email': 'charlie@example.com'}
-    ]
-    
-    res.type('application/json').json(users)
+    res.type('application/json').send(USERS_JSON)
 
 @api_router.get('/users/:id')
 def get_user_by_id(req, res):
@@ -430,15 +466,12 @@ def get_user_by_id(req, res):
     user_id = req.params.get('id')
     
     # Simulate finding a user
-    if user_id == '1':
-        res.type('application/json').json({'id': 1, 'name': 'Alice', 'email': 'alice@example.com'})
-    elif user_id == '2':
-        res.type('application/json').json({'id': 2, 'name': 'Bob', 'email': 'bob@example.com'})
-    elif user_id == '3':
-        res.type('application/json').json({'id': 3, 'name': 'Charlie', 'email': 'charlie@example.com'})
+    user_json = USER_JSON_BY_ID.get(user_id)
+    if user_json is not None:
+        res.type('application/json').send(user_json)
     else:
         # Add proper error handling for user not found
-        res.status(404).type('application/json').json({
+        res.status(404).json({
             'error': 'User not found',
             'message': f'No user with ID {user_id} exists',
             'status': 404
@@ -448,7 +481,7 @@ def get_user_by_id(req, res):
 def create_user(req, res):
     """Create a new user - responds to POST /api/users"""
     # In a real app, you would save this to a database
-    res.status(201).type('application/json').json({
+    res.status(201).json({
         'message': 'User created successfully',
         'user': req.body
     })
@@ -459,14 +492,14 @@ def update_user(req, res):
     user_id = req.params.get('id')
     
     # Check if user exists first
-    if user_id not in ['1', '2', '3']:
-        return res.status(404).type('application/json').json({
+    if user_id not in USER_JSON_BY_ID:
+        return res.status(404).json({
             'error': 'User not found',
             'message': f'Cannot update user with ID {user_id} - user does not exist',
             'status': 404
         })
     
-    res.type('application/json').json({
+    res.json({
         'message': f'User {user_id} updated successfully',
         'updated_fields': req.body
     })
@@ -477,14 +510,14 @@ def delete_user(req, res):
     user_id = req.params.get('id')
     
     # Check if user exists first
-    if user_id not in ['1', '2', '3']:
-        return res.status(404).type('application/json').json({
+    if user_id not in USER_JSON_BY_ID:
+        return res.status(404).json({
             'error': 'User not found',
             'message': f'Cannot delete user with ID {user_id} - user does not exist',
             'status': 404
         })
     
-    res.type('application/json').json({
+    res.json({
         'message': f'User {user_id} deleted successfully'
     })
 
@@ -4,13 +4,13 @@ Middleware Usage Example
 This example demonstrates how to use middleware utilities with Expressify.
 """
 
-from expressify import Expressify, Request, Response
+from expressify import expressify
 import middleware_utils as mw
 import os
-import json
+import time
 
 # Create the application
-app = Expressify()
+app = expressify()
 
 # Create a public directory for static files
 os.makedirs("public/static", exist_ok=True)
@@ -58,10 +58,17 @@ h1 {
 app.use(mw.logger("detailed"))  # Detailed logging
 app.use(mw.cors())  # CORS with default settings
 app.use(mw.json_parser())  # Parse JSON request bodies
-app.use(mw.static_files("public", "max-age=3600"))  # Serve files from the public directory
+app.use(mw.static_files("public/static", "max-age=3600"))  # Serve /static/* from public/static
 app.use(mw.security_headers())  # Add security headers
 app.use(mw.error_handler(include_stack_trace=True))  # Error handling
 
+# Add request timestamp middleware, registered with the rest so it runs for every route
+def add_timestamp(req, res, next):
+    req.timestamp = time.time()
+    return next()
+
+app.use(add_timestamp)
+
 # Define a validation schema for user data
 user_schema = {
     "body": {
@@ -130,8 +137,7 @@ def api_public(req, res):
     })
 
 # Apply route-specific middleware to protect this route
-@app.get('/api/protected')
-@mw.auth(strategy="bearer", secret="secret123")
+@app.get('/api/protected', [mw.auth(strategy="bearer", secret="secret123")])
 def api_protected(req, res):
     return res.json({
         "message": "This is protected data that requires authentication",
@@ -168,17 +174,6 @@ def test_error(req, res):
     # Deliberately throw an error to test error handling
     raise ValueError("This is a test error to demonstrate error handling middleware")
 
-# Add request timestamp middleware
-@app.use
-def add_timestamp(req, res, next):
-    req.timestamp = import_time().time()
-    return next()
-
-def import_time():
-    """Helper function to import time module"""
-    import time
-    return time
-
 # Start the server
 if __name__ == '__main__':
     app.listen(3001, '127.0.0.1')
@@ -4,10 +4,118 @@ Middleware Utilities for Expressify
 This module provides common middleware functions that can be imported and used in Expressify applications.
 """
 
+import atexit
+import gzip
+import hmac
 import time
-import json
+from collections import OrderedDict
 from functools import wraps
 import os
+import stat
+import sys
+import threading
+from time import monotonic
+
+# Expressify's JSON helpers use orjson when it is installed
+from expressify.lib.request import loads
+from expressify.lib.response import dumps
+
+# Header names shared by the middleware below, defined once instead of at every call site
+H_CONTENT_TYPE = "Content-Type"
+H_CACHE_CONTROL = "Cache-Control"
+H_CONTENT_ENCODING = "Content-Encoding"
+H_VARY = "Vary"
+H_RATE_LIMIT = "X-RateLimit-Limit"
+H_RATE_LIMIT_REMAINING = "X-RateLimit-Remaining"
+H_RATE_LIMIT_RESET = "X-RateLimit-Reset"
+H_ACCEPT_ENCODING = "accept-encoding"
+APPLICATION_JSON = "application/json"
+
+# Map file extensions (without the dot) to content types
+CONTENT_TYPES = {
+    "html": "text/html",
+    "css": "text/css",
+    "js": "application/javascript",
+    "json": "application/json",
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "gif": "image/gif",
+    "svg": "image/svg+xml",
+    "ico": "image/x-icon",
+    "txt": "text/plain"
+}
+
+# URL prefix served by static_files
+STATIC_PREFIX = "/static/"
+
+# Number of files static_files keeps in memory
+STATIC_CACHE_SIZE = 256
+
+# Files larger than this are streamed by res.send_file() instead of cached
+STATIC_CACHE_MAX_FILE_SIZE = 1024 * 1024
+
+# Headers added by security_headers
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+    "Content-Security-Policy": "default-src 'self'",
+    "Referrer-Policy": "strict-origin-when-cross-origin"
+}
+
+# Responses at or below this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = 1000
+
+# gzip level used by compression(), close to level 9's ratio at a fraction of the CPU
+GZIP_LEVEL = 6
+
+# Body of the response static_files sends for paths outside its directory
+ACCESS_DENIED = dumps({
+    "error": "Forbidden",
+    "message": "Access denied"
+})
+
+# Most clients rate_limiter tracks, the least recently seen are forgotten first
+RATE_LIMIT_MAX_CLIENTS = 100_000
+
+# Number of independently locked client tables in rate_limiter, a power of two
+RATE_LIMIT_SHARDS = 16
+
+# Seconds between writes of buffered log lines to stdout
+LOG_FLUSH_INTERVAL = 0.05
+
+# Log lines waiting to be written, appended to by every logger middleware
+_log_lines = []
+_log_flusher = None
+
+def flush_logs():
+    """Write all buffered log lines to stdout with a single write"""
+    if _log_lines:
+        lines = _log_lines[:]
+        del _log_lines[:len(lines)]
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+
+def _start_log_flusher():
+    """Start the background thread that flushes log lines, once per process"""
+    global _log_flusher
+    if _log_flusher is not None:
+        return
+    
+    def flush_periodically():
+        while True:
+            time.sleep(LOG_FLUSH_INTERVAL)
+            flush_logs()
+    
+    _log_flusher = threading.Thread(target=flush_periodically, name="log-flusher", daemon=True)
+    _log_flusher.start()
+    atexit.register(flush_logs)
+
+def send_json_bytes(res, status_code, body):
+    """Send a JSON body that was serialized ahead of time"""
+    return res.status(status_code).set_header(H_CONTENT_TYPE, APPLICATION_JSON).send(body)
 
 # Logger Middleware
 def logger(log_format="basic"):
@@ -20,50 +128,60 @@ def logger(log_format="basic"):
     Returns:
         function: Middleware function for logging
     """
-    def middleware(req, res, next):
-        start_time = time.time()
-        
-        # Log request
-        if log_format == "basic":
-            print(f"[REQUEST] {req.method} {req.path}")
-        elif log_format == "detailed":
-            print(f"[REQUEST] {req.method} {req.path}")
-            print(f"  Headers: {req.headers}")
-            if hasattr(req, 'body') and req.body:
-                print(f"  Body: {req.body[:200]}...")
-        elif log_format == "json":
-            log_data = {
+    # Lines are buffered and written in batches instead of one print per line
+    _start_log_flusher()
+    log = _log_lines.append
+    
+    # The format is fixed here, so each request runs a function specialized for it.
+    # The middleware is async so the response is logged after the handler has run.
+    if log_format == "basic":
+        async def middleware(req, res, next):
+            log(f"[REQUEST] {req.method} {req.path}")
+            
+            await next()
+            
+            duration = (monotonic() - req.start_time) * 1000  # Convert to ms
+            log(f"[RESPONSE] {res.status_code} - {duration:.2f}ms")
+    
+    elif log_format == "detailed":
+        async def middleware(req, res, next):
+            log(f"[REQUEST] {req.method} {req.path}")
+            log(f"  Headers: {req.headers}")
+            # Log the raw bytes, req.body would parse the body just for logging
+            if req.raw_body:
+                log(f"  Body: {req.raw_body[:200]}...")
+            
+            await next()
+            
+            duration = (monotonic() - req.start_time) * 1000  # Convert to ms
+            log(f"[RESPONSE] {res.status_code} - {duration:.2f}ms")
+            log(f"  Headers: {res.headers}")
+    
+    elif log_format == "json":
+        async def middleware(req, res, next):
+            log(dumps({
                 "type": "request",
                 "method": req.method,
                 "path": req.path,
                 "headers": req.headers,
                 "timestamp": time.time()
-            }
-            print(json.dumps(log_data))
-        
-        # Call next middleware
-        result = next()
-        
-        # Calculate duration
-        duration = (time.time() - start_time) * 1000  # Convert to ms
-        
-        # Log response
-        if log_format == "basic":
-            print(f"[RESPONSE] {res.status_code} - {duration:.2f}ms")
-        elif log_format == "detailed":
-            print(f"[RESPONSE] {res.status_code} - {duration:.2f}ms")
-            print(f"  Headers: {res.headers}")
-        elif log_format == "json":
-            log_data = {
+            }).decode())
+            
+            await next()
+            
+            duration = (monotonic() - req.start_time) * 1000  # Convert to ms
+            log(dumps({
                 "type": "response",
                 "status_code": res.status_code,
                 "duration_ms": round(duration, 2),
                 "headers": res.headers,
                 "timestamp": time.time()
-            }
-            print(json.dumps(log_data))
-        
-        return result
+            }).decode())
+    
+    else:
+        # Unknown formats log nothing, as before
+        def middleware(req, res, next):
+            return next()
     
     return middleware
 
@@ -87,14 +205,18 @@ def cors(origin="*", methods=None, headers=None, credentials=False):
     if headers is None:
         headers = ["Content-Type", "Authorization"]
     
+    # The header values never change, so they are joined once
+    cors_headers = {
+        "Access-Control-Allow-Origin": origin,
+        "Access-Control-Allow-Methods": ", ".join(methods),
+        "Access-Control-Allow-Headers": ", ".join(headers)
+    }
+    if credentials:
+        cors_headers["Access-Control-Allow-Credentials"] = "true"
+    
     def middleware(req, res, next):
         # Set CORS headers
-        res.set_header("Access-Control-Allow-Origin", origin)
-        res.set_header("Access-Control-Allow-Methods", ", ".join(methods))
-        res.set_header("Access-Control-Allow-Headers", ", ".join(headers))
-        
-        if credentials:
-            res.set_header("Access-Control-Allow-Credentials", "true")
+        res.extend_headers(cors_headers)
         
         # Handle preflight request
         if req.method == "OPTIONS":
@@ -116,10 +238,11 @@ def json_parser():
     def middleware(req, res, next):
         content_type = req.get_header("content-type", "")
         
-        if "application/json" in content_type and hasattr(req, "body") and req.body:
+        # Parse the raw bytes directly, req.body would already be a parsed value
+        if "application/json" in content_type and req.raw_body:
             try:
-                req.json = json.loads(req.body)
-            except json.JSONDecodeError as e:
+                req.json = loads(req.raw_body)
+            except ValueError as e:
                 return res.status(400).json({
                     "error": "Invalid JSON",
                     "message": str(e)
@@ -130,13 +253,14 @@ def json_parser():
     return middleware
 
 # Static Files Middleware
-def static_files(directory, cache_control=None):
+def static_files(directory, cache_control=None, preload=True):
     """
     Creates a middleware function for serving static files
     
     Args:
         directory (str): Directory containing static files
         cache_control (str): Cache-Control header value
+        preload (bool): Whether to read the directory's files into the cache up front
     
     Returns:
         function: Middleware function for serving static files
@@ -145,64 +269,88 @@ def static_files(directory, cache_control=None):
     if not os.path.exists(directory):
         os.makedirs(directory)
     
-    # Map file extensions to content types
-    CONTENT_TYPES = {
-        ".html": "text/html",
-        ".css": "text/css",
-        ".js": "application/javascript",
-        ".json": "application/json",
-        ".png": "image/png",
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".gif": "image/gif",
-        ".svg": "image/svg+xml",
-        ".ico": "image/x-icon",
-        ".txt": "text/plain"
-    }
-    
-    def get_content_type(file_path):
-        """Determine content type based on file extension"""
-        _, ext = os.path.splitext(file_path)
-        return CONTENT_TYPES.get(ext.lower(), "application/octet-stream")
+    # Resolved once so each request only joins and normalizes its own path
+    abs_dir = os.path.abspath(directory) + os.sep
+    prefix_len = len(STATIC_PREFIX)
+    
+    # file path -> [content, content type, mtime, gzipped content or None],
+    # least recently used first
+    cache = OrderedDict()
+    
+    def load(file_path, st):
+        """Read a file into the cache, evicting the least recently used entry if full"""
+        with open(file_path, "rb") as f:
+            content = f.read()
+        content_type = CONTENT_TYPES.get(file_path.rpartition(".")[2].lower(), "application/octet-stream")
+        entry = cache[file_path] = [content, content_type, st.st_mtime_ns, None]
+        cache.move_to_end(file_path)
+        if len(cache) > STATIC_CACHE_SIZE:
+            cache.popitem(last=False)
+        return entry
+    
+    # Warm the cache at startup so first requests don't hit the disk
+    if preload:
+        for root, _, files in os.walk(abs_dir):
+            for name in files:
+                file_path = os.path.join(root, name)
+                try:
+                    st = os.stat(file_path)
+                except OSError:
+                    continue
+                if stat.S_ISREG(st.st_mode) and st.st_size <= STATIC_CACHE_MAX_FILE_SIZE:
+                    load(file_path, st)
+                if len(cache) >= STATIC_CACHE_SIZE:
+                    break
+            if len(cache) >= STATIC_CACHE_SIZE:
+                break
     
     def middleware(req, res, next):
         if req.method != "GET":
             return next()
         
-        # Remove any query parameters
-        path = req.path.split("?")[0]
+        # req.path never includes the query string, Expressify splits it off into req.query
+        path = req.path
         
-        # Check if path starts with /static or is just a filename
-        if path.startswith("/static/"):
-            file_path = os.path.join(directory, path[8:])  # Remove "/static/" prefix
-        else:
-            # Don't try to serve non-static files
+        # Don't try to serve non-static files
+        if not path.startswith(STATIC_PREFIX):
             return next()
         
         # Normalize path to prevent directory traversal attacks
-        norm_path = os.path.normpath(file_path)
-        if not norm_path.startswith(os.path.abspath(directory)):
-            return res.status(403).json({
-                "error": "Forbidden",
-                "message": "Access denied"
-            })
+        file_path = os.path.normpath(os.path.join(abs_dir, path[prefix_len:]))
+        if not file_path.startswith(abs_dir):
+            return send_json_bytes(res, 403, ACCESS_DENIED)
         
-        # Check if file exists
-        if not os.path.exists(file_path) or not os.path.isfile(file_path):
+        # A single stat both checks the file and revalidates the cache
+        try:
+            st = os.stat(file_path)
+        except OSError:
             return next()  # Let next middleware handle it
+        if not stat.S_ISREG(st.st_mode):
+            return next()
         
         try:
-            # Set content type based on file extension
-            content_type = get_content_type(file_path)
-            res.set_header("Content-Type", content_type)
+            # Large files are streamed, or handed to sendfile by servers that support it
+            if st.st_size > STATIC_CACHE_MAX_FILE_SIZE:
+                if cache_control:
+                    res.set_header(H_CACHE_CONTROL, cache_control)
+                content_type = CONTENT_TYPES.get(file_path.rpartition(".")[2].lower(), "application/octet-stream")
+                return res.send_file(file_path, content_type)
+            
+            entry = cache.get(file_path)
+            if entry is not None and entry[2] == st.st_mtime_ns:
+                cache.move_to_end(file_path)
+            else:
+                entry = load(file_path, st)
+            
+            content, content_type = entry[0], entry[1]
+            res.set_header(H_CONTENT_TYPE, content_type)
+            
+            # Lets compression() reuse the gzipped copy kept in the cache entry
+            res.static_file = entry
             
             # Set cache header if provided
             if cache_control:
-                res.set_header("Cache-Control", cache_control)
-            
-            # Read file and send response
-            with open(file_path, "rb") as f:
-                content = f.read()
+                res.set_header(H_CACHE_CONTROL, cache_control)
             
             return res.send(content)
         except Exception as e:
@@ -226,39 +374,52 @@ def auth(strategy="bearer", secret=None, header_name="authorization"):
     Returns:
         function: Middleware function for authentication
     """
+    # Compared as bytes in constant time, so response timing doesn't leak the secret
+    expected = secret.encode("utf-8") if secret is not None else None
+    bearer_prefix = "Bearer "
+    prefix_len = len(bearer_prefix)
+    
+    # Rejection bodies are serialized once
+    missing_header = dumps({
+        "error": "Unauthorized",
+        "message": f"Missing {header_name} header"
+    })
+    invalid_format = dumps({
+        "error": "Unauthorized",
+        "message": "Invalid authorization format"
+    })
+    invalid_token = dumps({
+        "error": "Unauthorized",
+        "message": "Invalid token"
+    })
+    invalid_api_key = dumps({
+        "error": "Unauthorized",
+        "message": "Invalid API key"
+    })
+    
+    def is_valid(value):
+        """Check a provided token or key against the secret"""
+        return expected is not None and hmac.compare_digest(value.encode("utf-8"), expected)
+    
     def middleware(req, res, next):
         auth_header = req.get_header(header_name)
         
         if not auth_header:
-            return res.status(401).json({
-                "error": "Unauthorized",
-                "message": f"Missing {header_name} header"
-            })
+            return send_json_bytes(res, 401, missing_header)
         
         if strategy == "bearer":
-            if not auth_header.startswith("Bearer "):
-                return res.status(401).json({
-                    "error": "Unauthorized",
-                    "message": "Invalid authorization format"
-                })
-            
-            token = auth_header[7:]  # Remove "Bearer " prefix
+            if not auth_header.startswith(bearer_prefix):
+                return send_json_bytes(res, 401, invalid_format)
             
-            if token != secret:
-                return res.status(401).json({
-                    "error": "Unauthorized",
-                    "message": "Invalid token"
-                })
+            if not is_valid(auth_header[prefix_len:]):
+                return send_json_bytes(res, 401, invalid_token)
             
             # Add user info to request
             req.user = {"authenticated": True}
             
         elif strategy == "api-key":
-            if auth_header != secret:
-                return res.status(401).json({
-                    "error": "Unauthorized",
-                    "message": "Invalid API key"
-                })
+            if not is_valid(auth_header):
+                return send_json_bytes(res, 401, invalid_api_key)
             
             # Add user info to request
             req.user = {"authenticated": True}
@@ -283,37 +444,55 @@ def rate_limiter(max_requests=100, window_seconds=60):
     Returns:
         function: Middleware function for rate limiting
     """
-    # Store request timestamps for each client
-    clients = {}
+    # Token bucket per client: refilled at max_requests per window, holding at most max_requests
+    rate = max_requests / window_seconds
+    
+    # Clients are spread over shards with their own lock, so threads serving
+    # different clients rarely wait on each other
+    shards = [(OrderedDict(), threading.Lock()) for _ in range(RATE_LIMIT_SHARDS)]
+    shard_mask = RATE_LIMIT_SHARDS - 1
+    shard_size = RATE_LIMIT_MAX_CLIENTS // RATE_LIMIT_SHARDS
+    
+    # The limit header value and the rejection body never change
+    limit = str(max_requests)
+    too_many_requests = dumps({
+        "error": "Too Many Requests",
+        "message": f"Rate limit of {max_requests} requests per {window_seconds} seconds exceeded"
+    })
     
     def middleware(req, res, next):
-        client_ip = req.get_header("x-forwarded-for") or req.remote_addr
-        
-        # Initialize client record if doesn't exist
-        if client_ip not in clients:
-            clients[client_ip] = []
-        
-        # Get current time
-        now = time.time()
-        
-        # Remove requests outside the window
-        clients[client_ip] = [t for t in clients[client_ip] if now - t < window_seconds]
+        client_ip = req.get_header("x-forwarded-for") or req.ip
+        clients, lock = shards[hash(client_ip) & shard_mask]
+        
+        # The request's monotonic receive time, immune to wall-clock adjustments
+        now = req.start_time
+        
+        with lock:
+            bucket = clients.get(client_ip)
+            if bucket is None:
+                # Bounded memory: evict the least recently seen client when full
+                if len(clients) >= shard_size:
+                    clients.popitem(last=False)
+                bucket = clients[client_ip] = [float(max_requests), now]
+            else:
+                clients.move_to_end(client_ip)
+                # Refill for the time elapsed since the last request
+                bucket[0] = min(max_requests, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            
+            allowed = bucket[0] >= 1
+            if allowed:
+                bucket[0] -= 1
+            tokens = bucket[0]
         
         # Check if client has exceeded rate limit
-        if len(clients[client_ip]) >= max_requests:
-            return res.status(429).json({
-                "error": "Too Many Requests",
-                "message": f"Rate limit of {max_requests} requests per {window_seconds} seconds exceeded"
-            })
+        if not allowed:
+            return send_json_bytes(res, 429, too_many_requests)
         
-        # Add current request timestamp
-        clients[client_ip].append(now)
-        
-        # Add rate limit headers
-        remaining = max_requests - len(clients[client_ip])
-        res.set_header("X-RateLimit-Limit", str(max_requests))
-        res.set_header("X-RateLimit-Remaining", str(remaining))
-        res.set_header("X-RateLimit-Reset", str(int(now + window_seconds)))
+        # Add rate limit headers, the reset time is when the bucket is full again
+        res.set_header(H_RATE_LIMIT, limit)
+        res.set_header(H_RATE_LIMIT_REMAINING, str(int(tokens)))
+        res.set_header(H_RATE_LIMIT_RESET, str(int(time.time() + (max_requests - tokens) / rate)))
         
         return next()
     
@@ -364,28 +543,33 @@ def compression():
         function: Middleware function for compression
     """
     def middleware(req, res, next):
+        # Clients that don't accept gzip keep the original send method, no wrapper is created
+        if "gzip" not in req.get_header(H_ACCEPT_ENCODING, ""):
+            return next()
+        
         # Store original send method
         original_send = res.send
         
         # Override send method to add compression
         def compressed_send(content):
-            # Check if client accepts gzip encoding
-            accept_encoding = req.get_header("accept-encoding", "")
-            
-            if "gzip" in accept_encoding:
-                import gzip
-                
-                # Don't compress if already compressed or content is too small
+            # Don't compress if already compressed or content is too small
+            if H_CONTENT_ENCODING not in res.headers:
                 if isinstance(content, str):
                     content = content.encode("utf-8")
                 
-                if len(content) > 1000:  # Only compress if content is large enough
-                    # Compress content
-                    compressed = gzip.compress(content)
+                if len(content) > COMPRESSION_MIN_SIZE:  # Only compress if content is large enough
+                    static_file = getattr(res, "static_file", None)
+                    if static_file is not None and static_file[0] is content:
+                        # Static files are compressed once and cached with their bytes
+                        if static_file[3] is None:
+                            static_file[3] = gzip.compress(content, compresslevel=GZIP_LEVEL)
+                        compressed = static_file[3]
+                    else:
+                        compressed = gzip.compress(content, compresslevel=GZIP_LEVEL)
                     
                     # Set headers
-                    res.set_header("Content-Encoding", "gzip")
-                    res.set_header("Vary", "Accept-Encoding")
+                    res.set_header(H_CONTENT_ENCODING, "gzip")
+                    res.set_header(H_VARY, "Accept-Encoding")
                     
                     # Send compressed content
                     return original_send(compressed)
@@ -411,30 +595,41 @@ def validate_request(schema):
     Returns:
         function: Middleware function for request validation
     """
+    def required_fields(section):
+        """Names of the fields marked required in a schema section"""
+        return tuple(name for name, rules in schema.get(section, {}).items() if rules.get("required"))
+    
+    # Filter the schema once so each request only checks the required fields
+    required_headers = required_fields("headers")
+    required_query = required_fields("query")
+    required_body = required_fields("body")
+    
     def middleware(req, res, next):
         errors = []
         
         # Validate headers
-        if "headers" in schema:
-            for header, rules in schema["headers"].items():
-                value = req.get_header(header)
-                
-                if "required" in rules and rules["required"] and not value:
-                    errors.append(f"Missing required header: {header}")
+        for header in required_headers:
+            if not req.get_header(header):
+                errors.append(f"Missing required header: {header}")
         
         # Validate query parameters
-        if "query" in schema:
-            for param, rules in schema["query"].items():
-                value = req.query.get(param)
-                
-                if "required" in rules and rules["required"] and not value:
-                    errors.append(f"Missing required query parameter: {param}")
+        for param in required_query:
+            if not req.query.get(param):
+                errors.append(f"Missing required query parameter: {param}")
         
         # Validate body
-        if "body" in schema and hasattr(req, "json"):
-            for field, rules in schema["body"].items():
-                if "required" in rules and rules["required"] and field not in req.json:
-                    errors.append(f"Missing required field in body: {field}")
+        # req.json is always defined, None when the request has no JSON body
+        if required_body:
+            try:
+                body = req.json or {}
+            except ValueError:
+                # Malformed JSON is a validation failure, not a server error
+                errors.append("Request body is not valid JSON")
+                body = None
+            if body is not None:
+                for field in required_body:
+                    if field not in body:
+                        errors.append(f"Missing required field in body: {field}")
         
         if errors:
             return res.status(400).json({
@@ -457,12 +652,7 @@ def security_headers():
     """
     def middleware(req, res, next):
         # Set security headers
-        res.set_header("X-Content-Type-Options", "nosniff")
-        res.set_header("X-Frame-Options", "DENY")
-        res.set_header("X-XSS-Protection", "1; mode=block")
-        res.set_header("Strict-Transport-Security", "max-age=31536000; includeSubDomains")
-        res.set_header("Content-Security-Policy", "default-src 'self'")
-        res.set_header("Referrer-Policy", "strict-origin-when-cross-origin")
+        res.extend_headers(SECURITY_HEADERS)
         
         return next()
     
@@ -4,29 +4,125 @@ Simple HTTP server with middleware functionality
 This is a basic HTTP server that implements middleware pattern for handling requests.
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import atexit
+import gzip
+import hashlib
 import json
 import time
 from datetime import datetime
+from functools import lru_cache
+import mimetypes
 import os
+import re
+import signal
+import socket
+import stat
 import urllib.parse
 import sys
+import threading
 import traceback
 
+try:
+    from functools import cached_property
+except ImportError:
+    # Python 3.7: compute on first access and store the value in the instance
+    # __dict__, which then shadows the descriptor just like functools' version
+    class cached_property:
+        def __init__(self, func):
+            self.func = func
+            self.__doc__ = func.__doc__
+        
+        def __set_name__(self, owner, name):
+            self.name = name
+        
+        def __get__(self, obj, owner=None):
+            if obj is None:
+                return self
+            value = obj.__dict__[self.name] = self.func(obj)
+            return value
+
+# Use orjson when it is installed, it encodes straight to bytes
+try:
+    import orjson
+    
+    def dumps(data):
+        return orjson.dumps(data)
+except ImportError:
+    def dumps(data):
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
 # Configuration
 HOST = "127.0.0.1"
 PORT = 3001
+# Worker processes sharing the port, each serving requests on its own threads
+WORKERS = int(os.environ.get("WORKERS", os.cpu_count() or 1))
+# Seconds an idle keep-alive connection may hold its thread
+KEEPALIVE_TIMEOUT = 5
+
+# How often buffered log output is written out, in seconds
+LOG_FLUSH_INTERVAL = 0.05
+# Log levels as in the logging module; per-request detail is only logged at DEBUG
+DEBUG = 10
+INFO = 20
+LOG_LEVEL = int(os.environ.get("LOG_LEVEL", INFO))
+
+# Set up basic logging; lines collect in a 64KB buffer instead of costing a write() each
+_log_out = open(sys.stdout.fileno(), "w", buffering=65536, closefd=False)
+_log_lock = threading.Lock()
 
-# Set up basic logging
 def log(message):
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}")
-    sys.stdout.flush()  # Force output to be written immediately
+    line = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}\n"
+    with _log_lock:
+        _log_out.write(line)
+
+def logd(message_fn):
+    """Log a debug message, building it only when debug logging is enabled"""
+    if LOG_LEVEL <= DEBUG:
+        log(message_fn())
+
+def flush_logs():
+    """Write out any buffered log lines"""
+    with _log_lock:
+        _log_out.flush()
+
+def _flush_logs_periodically():
+    while True:
+        time.sleep(LOG_FLUSH_INTERVAL)
+        flush_logs()
+
+def start_log_flusher():
+    """Start the background thread that flushes the log buffer"""
+    threading.Thread(target=_flush_logs_periodically, daemon=True).start()
+
+def _lock_logs_for_fork():
+    """Flush and hold the log lock across fork(), so no thread holds it at that moment"""
+    _log_lock.acquire()
+    _log_out.flush()
+
+def _unlock_logs_in_parent():
+    _log_lock.release()
+
+def _unlock_logs_in_child():
+    # The child inherits the lock held by the forking thread; release it
+    # before starting the child's own flusher thread
+    _log_lock.release()
+    start_log_flusher()
+
+start_log_flusher()
+atexit.register(flush_logs)
+# Forked workers must not inherit unflushed lines or a held lock, and need their own flusher thread
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_lock_logs_for_fork, after_in_parent=_unlock_logs_in_parent,
+                        after_in_child=_unlock_logs_in_child)
 
 log("Starting server initialization")
 
 # Ensure the public directory exists
 PUBLIC_DIR = "public"
 os.makedirs(PUBLIC_DIR, exist_ok=True)
+# Canonical location of the public directory, resolved once at startup
+PUBLIC_ROOT = os.path.realpath(PUBLIC_DIR)
 log(f"Public directory ensured at: {os.path.abspath(PUBLIC_DIR)}")
 
 # Create some test files if they don't exist
@@ -111,44 +207,82 @@ if not os.path.exists(os.path.join(PUBLIC_DIR, "test.html")):
 
 log("Test files created")
 
+# Path prefixes the middleware care about, matched once per request
+_ROUTE_RE = re.compile(r'(?P<prot>/protected)|(?P<pub>/public/)|(?P<root>/\Z)')
+
 # Simple request and response objects
 class Request:
     def __init__(self, handler):
         self.handler = handler
+        self.start_time = time.time()
         self.method = handler.command
-        self.path = handler.path.split('?')[0]
-        self.headers = {k.lower(): v for k, v in handler.headers.items()}
-        self.query = {}
-        self.body = {}
-        self.body_raw = ""
-        
-        # Parse query string
-        if '?' in handler.path:
-            query_string = handler.path.split('?', 1)[1]
-            self.query = {k: v[0] for k, v in urllib.parse.parse_qs(query_string).items()}
+        self.raw_path = handler.path
+        self.path, _, self.query_string = handler.path.partition('?')
+        # Which prefix group the path falls under: 'prot', 'pub', 'root' or None
+        match = _ROUTE_RE.match(self.path)
+        self._route = match.lastgroup if match else None
+        # The handler's headers already support case-insensitive lookups
+        self.headers = handler.headers
+    
+    # Query and body are only parsed when a handler asks for them
+    @cached_property
+    def query(self):
+        if not self.query_string:
+            return {}
+        return {k: v[0] for k, v in urllib.parse.parse_qs(self.query_string).items()}
+    
+    @cached_property
+    def body_raw(self):
+        content_length = int(self.header('Content-Length', 0))
+        if content_length <= 0:
+            return ""
+        return self.handler.rfile.read(content_length).decode('utf-8')
+    
+    def drain(self):
+        """Discard a body nobody read so the next request on the connection parses cleanly"""
+        if 'body_raw' not in self.__dict__:
+            content_length = int(self.header('Content-Length', 0))
+            if content_length > 0:
+                self.handler.rfile.read(content_length)
+    
+    @cached_property
+    def body(self):
+        body_data = self.body_raw
+        if not body_data:
+            return {}
         
-        # Read and parse body if present
-        content_length = int(self.headers.get('content-length', 0))
-        if content_length > 0:
-            body_data = handler.rfile.read(content_length).decode('utf-8')
-            self.body_raw = body_data
-            
-            # Parse JSON body
-            if 'application/json' in self.headers.get('content-type', ''):
-                try:
-                    self.body = json.loads(body_data)
-                except:
-                    self.body = {}
-            # Parse form data
-            elif 'application/x-www-form-urlencoded' in self.headers.get('content-type', ''):
-                self.body = {k: v[0] for k, v in urllib.parse.parse_qs(body_data).items()}
+        # Parse JSON body
+        content_type = self.header('Content-Type', '')
+        if 'application/json' in content_type:
+            try:
+                return json.loads(body_data)
+            except ValueError:
+                return {}
+        # Parse form data
+        elif 'application/x-www-form-urlencoded' in content_type:
+            return {k: v[0] for k, v in urllib.parse.parse_qs(body_data).items()}
+        return {}
+    
+    def header(self, name, default=None):
+        """Get a request header, matching the name case-insensitively"""
+        return self.headers.get(name, default)
 
 class Response:
+    __slots__ = ('handler', 'status_code', 'headers')
+    
     def __init__(self, handler):
         self.handler = handler
         self.status_code = 200
         self.headers = {'Content-Type': 'text/html'}
     
+    def reset(self, handler):
+        """Prepare this response for reuse on another request"""
+        self.handler = handler
+        self.status_code = 200
+        # Cleared in place so the dict keeps its allocated size
+        self.headers.clear()
+        self.headers['Content-Type'] = 'text/html'
+    
     def status(self, code):
         self.status_code = code
         return self
@@ -159,21 +293,49 @@ class Response:
     
     def json(self, data):
         self.headers['Content-Type'] = 'application/json'
-        self.send(json.dumps(data))
+        self.send(dumps(data))
         return self
     
     def send(self, content):
-        self.handler.send_response(self.status_code)
-        
-        for name, value in self.headers.items():
-            self.handler.send_header(name, value)
-        
-        self.handler.end_headers()
-        
         if isinstance(content, str):
-            self.handler.wfile.write(content.encode('utf-8'))
-        elif isinstance(content, bytes):
-            self.handler.wfile.write(content)
+            content = content.encode('utf-8')
+        # A known length lets HTTP/1.1 clients keep the connection open
+        self.headers['Content-Length'] = str(len(content))
+        # Status line, headers and body go out in a single write
+        self.handler.wfile.write(self.head() + content)
+        
+        return self
+    
+    def not_modified(self):
+        """Send a header-only 304; a Content-Length there would describe the cached copy"""
+        self.status_code = 304
+        self.headers.pop('Content-Length', None)
+        self.handler.wfile.write(self.head())
+        return self
+    
+    def head(self):
+        """Build the status line and headers as one block of bytes"""
+        handler = self.handler
+        handler.log_request(self.status_code)
+        reason = handler.responses.get(self.status_code, ('',))[0]
+        lines = [
+            f"{handler.protocol_version} {self.status_code} {reason}",
+            f"Server: {handler.version_string()}",
+            f"Date: {handler.date_time_string()}",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in self.headers.items())
+        lines.append("\r\n")
+        return "\r\n".join(lines).encode('latin-1')
+    
+    def send_file(self, file_path):
+        """Send a file straight from the kernel page cache with sendfile()"""
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self.headers['Content-Length'] = str(size)
+            self.handler.wfile.write(self.head())
+            
+            # socket.sendfile() uses os.sendfile() and falls back to send() where unavailable
+            self.handler.connection.sendfile(f, 0, size)
         
         return self
     
@@ -183,30 +345,30 @@ class Response:
         self.send('')
         return self
 
+# Each connection thread reuses one Response object across the requests it handles.
+# Unlike in Expressify, where handlers may keep res, this is safe here: every handler
+# is defined in this file, runs synchronously and writes its response before returning,
+# and none of them keeps res after that
+_tls = threading.local()
+
 log("Request and Response classes initialized")
 
-# Middleware functions
-def logger_middleware(req, res, next):
+# Middleware functions; each returns True once it has sent a response to stop the chain
+def logger_middleware(req, res):
     """Log request details"""
-    start_time = time.time()
-    log(f"Request: {req.method} {req.path}")
-    log(f"Headers: {req.headers}")
-    
-    if req.body:
-        log(f"Body: {req.body}")
-    
-    result = next()
-    
-    end_time = time.time()
-    duration = (end_time - start_time) * 1000  # Convert to ms
-    log(f"Response: {res.status_code} - {duration:.2f}ms")
-    
-    return result
+    # Headers and body are only formatted when someone will read them
+    logd(lambda: f"Headers: {dict(req.headers)}\nBody: {req.body}" if req.body else f"Headers: {dict(req.headers)}")
+    return False
+
+def log_response(req, res):
+    """Log the outcome of a request once the chain has finished"""
+    duration = (time.time() - req.start_time) * 1000  # Convert to ms
+    log(f"{req.method} {req.path} {res.status_code} - {duration:.2f}ms")
 
-def auth_middleware(req, res, next):
+def auth_middleware(req, res):
     """Check for API key on protected routes"""
-    if req.path.startswith('/protected'):
-        api_key = req.headers.get('x-api-key')
+    if req._route == 'prot':
+        api_key = req.header('X-API-Key')
         
         if not api_key:
             log("Auth failed: No API key provided")
@@ -214,7 +376,7 @@ def auth_middleware(req, res, next):
                 'error': 'Authentication required',
                 'message': 'Missing API key. Please provide X-API-Key header.'
             })
-            return res
+            return True
         
         if api_key != 'abc123':
             log(f"Auth failed: Invalid API key: {api_key}")
@@ -222,63 +384,179 @@ def auth_middleware(req, res, next):
                 'error': 'Access denied',
                 'message': 'Invalid API key'
             })
-            return res
+            return True
         
-        log("Auth successful")
+        logd(lambda: "Auth successful")
+    
+    return False
+
+# Files up to this size are kept in memory; larger ones are streamed with sendfile()
+FILE_CACHE_MAX_SIZE = 1024 * 1024
+# Content types worth compressing; images and archives are already compressed
+COMPRESSIBLE_TYPES = frozenset([
+    'text/html', 'text/css', 'text/plain', 'text/xml', 'text/csv',
+    'application/javascript', 'text/javascript', 'application/json', 'image/svg+xml',
+])
+# File path -> (mtime_ns, content or None, content type, ETag, gzipped content or None, gzip ETag); entries are immutable
+# tuples swapped in with a single assignment, so connection threads can share it without a lock
+_FILE_CACHE = {}
+
+# Content types that take precedence over the mimetypes table
+EXT_TO_CT = {
+    '.html': 'text/html',
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.json': 'application/json',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+}
+
+# Read the system MIME type tables once at startup
+mimetypes.init()
+
+@lru_cache(maxsize=256)
+def content_type_for_ext(ext):
+    """Map a lowercased file extension to a Content-Type"""
+    return EXT_TO_CT.get(ext) or mimetypes.types_map.get(ext) or 'application/octet-stream'
+
+def guess_content_type(file_path):
+    """Pick a Content-Type from the file extension"""
+    return content_type_for_ext(os.path.splitext(file_path)[1].lower())
+
+def cached_file(file_path, st):
+    """Return the cache entry for a file, reloading it if it changed on disk"""
+    entry = _FILE_CACHE.get(file_path)
+    
+    if entry is None or entry[0] != st.st_mtime_ns:
+        content_type = guess_content_type(file_path)
+        gzipped = None
+        if st.st_size <= FILE_CACHE_MAX_SIZE:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+            etag = f'"{hashlib.blake2b(content, digest_size=8).hexdigest()}"'
+            # Compressed once here so requests never pay for it; kept only if it helps
+            if content_type in COMPRESSIBLE_TYPES:
+                compressed = gzip.compress(content, compresslevel=9)
+                if len(compressed) < len(content):
+                    gzipped = compressed
+        else:
+            # Too big to hold or hash on every change; size and mtime identify the version
+            content = None
+            etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+        # Each encoding is a separate representation and needs its own strong ETag
+        gzip_etag = etag[:-1] + '-gz"' if gzipped is not None else None
+        entry = (st.st_mtime_ns, content, content_type, etag, gzipped, gzip_etag)
+        _FILE_CACHE[file_path] = entry
     
-    return next()
+    return entry
 
-def static_files_middleware(req, res, next):
+# Seconds between rescans of the public directory for added or changed files
+STATIC_RESCAN_INTERVAL = 2
+
+def load_static():
+    """Load every file under the public directory into a URL path -> (file path, entry) map"""
+    static = {}
+    
+    for root, _, files in os.walk(PUBLIC_ROOT):
+        for name in files:
+            file_path = os.path.realpath(os.path.join(root, name))
+            # Symlinks pointing out of the public directory are not served
+            if not file_path.startswith(PUBLIC_ROOT + os.sep):
+                continue
+            try:
+                st = os.stat(file_path)
+                if stat.S_ISREG(st.st_mode):
+                    url_path = '/public/' + os.path.relpath(file_path, PUBLIC_ROOT).replace(os.sep, '/')
+                    static[url_path] = (file_path, cached_file(file_path, st))
+            except OSError as e:
+                log(f"Error loading {file_path}: {e}")
+    
+    if '/public/index.html' in static:
+        static['/'] = static['/public/index.html']
+    return static
+
+# Built once at startup and replaced wholesale by the rescanner, never mutated in place
+STATIC = load_static()
+log(f"Preloaded {len(STATIC)} static routes")
+
+def _rescan_static():
+    global STATIC
+    while True:
+        time.sleep(STATIC_RESCAN_INTERVAL)
+        STATIC = load_static()
+
+def start_static_rescanner():
+    """Start the background thread that picks up changes in the public directory"""
+    threading.Thread(target=_rescan_static, daemon=True).start()
+
+def send_static(req, res, file_path, entry):
+    """Send a cached file, or a 304 if the client already has it"""
+    _, content, content_type, etag, gzipped, gzip_etag = entry
+    use_gzip = gzipped is not None and 'gzip' in req.header('Accept-Encoding', '')
+    if gzipped is not None:
+        res.set_header('Vary', 'Accept-Encoding')
+    if use_gzip:
+        etag = gzip_etag
+    res.set_header('ETag', etag)
+    # Set before the 304 too, since caches copy its headers onto the stored file
+    res.set_header('Content-Type', content_type)
+    
+    # The client already has this version of the chosen encoding
+    if req.header('If-None-Match') == etag:
+        res.not_modified()
+        return True
+    
+    logd(lambda: f"Serving file: {file_path}")
+    res.status(200)
+    if content is None:
+        res.send_file(file_path)
+    elif use_gzip:
+        res.set_header('Content-Encoding', 'gzip')
+        res.send(gzipped)
+    else:
+        res.send(content)
+    return True
+
+def static_files_middleware(req, res):
     """Serve static files from the public directory"""
-    if req.method == 'GET':
+    route = req._route
+    if req.method == 'GET' and (route == 'pub' or route == 'root'):
+        # Preloaded files are served without touching the filesystem
+        static = STATIC.get(req.path)
+        if static is not None:
+            try:
+                return send_static(req, res, *static)
+            except Exception as e:
+                log(f"Error reading file: {e}")
+                return False
+        
         # Special handling for root path
-        if req.path == '/':
-            file_path = os.path.join(PUBLIC_DIR, "index.html")
-        # Serve files from public directory
-        elif req.path.startswith('/public/'):
-            file_path = os.path.join(os.getcwd(), req.path[1:])
+        if route == 'root':
+            file_path = os.path.join(PUBLIC_ROOT, "index.html")
+        # Files added since the last rescan are looked up on disk
         else:
-            return next()
+            file_path = os.path.realpath(os.path.join(PUBLIC_ROOT, req.path[len('/public/'):]))
+            # Refuse anything that resolves outside the public directory
+            if not file_path.startswith(PUBLIC_ROOT + os.sep):
+                return False
         
-        log(f"Looking for file: {file_path}")
+        logd(lambda: f"Looking for file: {file_path}")
         
-        if os.path.exists(file_path) and os.path.isfile(file_path):
-            # Determine content type
-            if file_path.endswith('.html'):
-                content_type = 'text/html'
-            elif file_path.endswith('.css'):
-                content_type = 'text/css'
-            elif file_path.endswith('.js'):
-                content_type = 'application/javascript'
-            elif file_path.endswith('.json'):
-                content_type = 'application/json'
-            elif file_path.endswith('.png'):
-                content_type = 'image/png'
-            elif file_path.endswith('.jpg') or file_path.endswith('.jpeg'):
-                content_type = 'image/jpeg'
-            else:
-                content_type = 'text/plain'
-            
-            # Read and send the file
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return False
+        
+        if stat.S_ISREG(st.st_mode):
             try:
-                with open(file_path, 'rb') as f:
-                    content = f.read()
-                
-                log(f"Serving file: {file_path}")
-                res.status(200)
-                res.set_header('Content-Type', content_type)
-                res.send(content)
-                return res
+                return send_static(req, res, file_path, cached_file(file_path, st))
             except Exception as e:
                 log(f"Error reading file: {e}")
         
-    return next()
+    return False
 
-def routes_middleware(req, res, next):
-    """Handle application routes"""
-    if req.method == 'GET':
-        if req.path == '/about':
-            return res.send("""
+ABOUT_PAGE = b"""
 <!DOCTYPE html>
 <html>
 <head>
@@ -294,114 +572,166 @@ def routes_middleware(req, res, next):
     <p><a href="/">Back to Home</a></p>
 </body>
 </html>
-""")
-        elif req.path == '/api':
-            return res.json({
-                'message': 'API endpoint',
-                'timestamp': datetime.now().isoformat()
-            })
-        elif req.path == '/protected':
-            return res.json({
-                'message': 'You have accessed a protected endpoint',
-                'timestamp': datetime.now().isoformat()
-            })
-    elif req.method == 'POST':
-        if req.path == '/echo':
-            return res.json({
-                'echo': req.body,
-                'headers': req.headers,
-                'timestamp': datetime.now().isoformat()
-            })
+"""
+
+# Route handlers
+def handle_about(req, res):
+    return res.send(ABOUT_PAGE)
+
+def handle_api(req, res):
+    return res.json({
+        'message': 'API endpoint',
+        'timestamp': datetime.now().isoformat()
+    })
+
+def handle_protected(req, res):
+    return res.json({
+        'message': 'You have accessed a protected endpoint',
+        'timestamp': datetime.now().isoformat()
+    })
+
+def handle_echo(req, res):
+    return res.json({
+        'echo': req.body,
+        'headers': {k.lower(): v for k, v in req.headers.items()},
+        'timestamp': datetime.now().isoformat()
+    })
+
+# Route table keyed by (method, path)
+ROUTES = {
+    ('GET', '/about'): handle_about,
+    ('GET', '/api'): handle_api,
+    ('GET', '/protected'): handle_protected,
+    ('POST', '/echo'): handle_echo,
+}
+
+def routes_middleware(req, res):
+    """Handle application routes"""
+    handler = ROUTES.get((req.method, req.path))
+    if handler is None:
+        return False
     
-    return next()
+    handler(req, res)
+    return True
+
+# Middleware chain, run in order for every request
+MIDDLEWARE = (
+    logger_middleware,
+    auth_middleware,
+    static_files_middleware,
+    routes_middleware,
+)
 
 log("Middleware functions defined")
 
 # Main HTTP request handler
 class MiddlewareHandler(BaseHTTPRequestHandler):
+    # Keep connections open between requests; every response carries a Content-Length
+    protocol_version = "HTTP/1.1"
+    # Don't let Nagle hold back a small response waiting on the client's ACK
+    disable_nagle_algorithm = True
+    timeout = KEEPALIVE_TIMEOUT
+    
     def log_message(self, format, *args):
-        log(f"Server log: {format % args}")
+        logd(lambda: f"Server log: {format % args}")
     
     def handle_error(self, e):
         log(f"Error handling request: {str(e)}")
         log("".join(traceback.format_exception(type(e), e, e.__traceback__)))
         try:
+            body = dumps({
+                'error': 'Internal Server Error',
+                'message': str(e)
+            })
             self.send_response(500)
             self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            # The request may not have been read in full, so don't reuse the connection
+            self.send_header('Connection', 'close')
             self.end_headers()
-            self.wfile.write(json.dumps({
-                'error': 'Internal Server Error',
-                'message': str(e)
-            }).encode('utf-8'))
+            self.wfile.write(body)
         except:
             log("Error sending error response")
     
     def do_GET(self):
         try:
-            log(f"Handling GET request for {self.path}")
+            logd(lambda: f"Handling GET request for {self.path}")
             self.process_request()
         except Exception as e:
             self.handle_error(e)
         
     def do_POST(self):
         try:
-            log(f"Handling POST request for {self.path}")
+            logd(lambda: f"Handling POST request for {self.path}")
             self.process_request()
         except Exception as e:
             self.handle_error(e)
         
     def do_PUT(self):
         try:
-            log(f"Handling PUT request for {self.path}")
+            logd(lambda: f"Handling PUT request for {self.path}")
             self.process_request()
         except Exception as e:
             self.handle_error(e)
         
     def do_DELETE(self):
         try:
-            log(f"Handling DELETE request for {self.path}")
+            logd(lambda: f"Handling DELETE request for {self.path}")
             self.process_request()
         except Exception as e:
             self.handle_error(e)
     
     def process_request(self):
-        log("Processing request")
+        logd(lambda: "Processing request")
         # Create request and response objects
         req = Request(self)
-        res = Response(self)
-        
-        # Create middleware chain
-        middleware_chain = [
-            logger_middleware,
-            auth_middleware,
-            static_files_middleware,
-            routes_middleware
-        ]
+        res = getattr(_tls, 'response', None)
+        if res is None:
+            res = _tls.response = Response(self)
+        else:
+            res.reset(self)
         
-        # Function to execute middleware chain
-        def execute_middleware(index=0):
-            if index < len(middleware_chain):
-                return middleware_chain[index](req, res, lambda: execute_middleware(index + 1))
-            else:
-                # End of middleware chain, return 404
-                res.status(404).json({
-                    'error': 'Not Found',
-                    'message': f'No route found for {req.method} {req.path}'
-                })
-                return res
+        # Execute middleware chain until one of them sends a response
+        logd(lambda: "Executing middleware chain")
+        for middleware in MIDDLEWARE:
+            if middleware(req, res):
+                break
+        else:
+            # End of middleware chain, return 404
+            res.status(404).json({
+                'error': 'Not Found',
+                'message': f'No route found for {req.method} {req.path}'
+            })
         
-        # Execute middleware chain
-        log("Executing middleware chain")
-        execute_middleware()
-        log("Middleware chain execution completed")
+        req.drain()
+        log_response(req, res)
+        logd(lambda: "Middleware chain execution completed")
 
 log("MiddlewareHandler class defined")
 
-def run_server():
-    """Start the HTTP server"""
+class ReusePortServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server whose port can be bound by several worker processes
+    Each connection gets its own thread: a keep-alive connection holds its thread
+    while idle, so a fixed-size pool would leave new clients queued behind idle ones
+    """
+    daemon_threads = True
+    # socketserver's default backlog of 5 drops connections under concurrent load
+    request_queue_size = 1024
+    
+    def server_bind(self):
+        # Every worker binds its own socket and the kernel spreads connections between them
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+def serve():
+    """Run one worker's HTTP server until interrupted"""
+    server = None
     try:
         log(f"Creating HTTP server on {HOST}:{PORT}")
-        server = HTTPServer((HOST, PORT), MiddlewareHandler)
+        server = ReusePortServer((HOST, PORT), MiddlewareHandler)
+        start_static_rescanner()
         log(f"Server created successfully at http://{HOST}:{PORT}")
         
         log("Starting server...")
@@ -413,30 +743,60 @@ def run_server():
         log("".join(traceback.format_exception(type(e), e, e.__traceback__)))
     finally:
         log("Server stopped")
-        try:
-            server.server_close()
-            log("Server closed successfully")
-        except Exception as e:
-            log(f"Error closing server: {str(e)}")
+        if server is not None:
+            try:
+                server.server_close()
+                log("Server closed successfully")
+            except Exception as e:
+                log(f"Error closing server: {str(e)}")
+
+def run_server():
+    """Start the HTTP server, forking extra workers where SO_REUSEPORT is available"""
+    workers = WORKERS if hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT") else 1
+    children = []
+    
+    for _ in range(workers - 1):
+        pid = os.fork()
+        if pid == 0:
+            serve()
+            flush_logs()
+            os._exit(0)
+        children.append(pid)
+    
+    log(f"Serving with {workers} worker process(es)")
+    try:
+        serve()
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
 
 log("Server runner function defined")
 
 if __name__ == "__main__":
     try:
-        log("\nMiddleware Demo Server")
-        log("=====================")
-        log(f"Server running at http://{HOST}:{PORT}")
-        
-        log("\nAvailable Routes:")
-        log(f"  - GET  http://{HOST}:{PORT}/             - Home page")
-        log(f"  - GET  http://{HOST}:{PORT}/about        - About page")
-        log(f"  - GET  http://{HOST}:{PORT}/api          - API endpoint")
-        log(f"  - GET  http://{HOST}:{PORT}/protected    - Protected route (requires API key)")
-        log(f"  - GET  http://{HOST}:{PORT}/public/test.html - Static file")
-        log(f"  - POST http://{HOST}:{PORT}/echo         - Echo API")
-        
-        log("\nAPI Key for testing protected routes:")
-        log("  Header: X-API-Key: abc123")
+        # Build the banner up front so it goes out as one write
+        banner = "\n".join([
+            "",
+            "Middleware Demo Server",
+            "=====================",
+            f"Server running at http://{HOST}:{PORT}",
+            "",
+            "Available Routes:",
+            f"  - GET  http://{HOST}:{PORT}/             - Home page",
+            f"  - GET  http://{HOST}:{PORT}/about        - About page",
+            f"  - GET  http://{HOST}:{PORT}/api          - API endpoint",
+            f"  - GET  http://{HOST}:{PORT}/protected    - Protected route (requires API key)",
+            f"  - GET  http://{HOST}:{PORT}/public/test.html - Static file",
+            f"  - POST http://{HOST}:{PORT}/echo         - Echo API",
+            "",
+            "API Key for testing protected routes:",
+            "  Header: X-API-Key: abc123",
+        ])
+        log(banner)
+        flush_logs()
         
         # Run the server
         log("Calling run_server function")
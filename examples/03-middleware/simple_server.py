@@ -2,21 +2,45 @@
 Simple HTTP server for testing middleware concepts
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from functools import lru_cache
 import json
+import mimetypes
 import os
+import signal
+import socket
+import sys
 
 # Configuration
 HOST = "127.0.0.1"
 PORT = 5000
+# Worker processes sharing the port, each serving requests on its own threads
+WORKERS = int(os.environ.get("WORKERS", os.cpu_count() or 1))
 
 # Ensure the public directory exists
 PUBLIC_DIR = "public"
 os.makedirs(PUBLIC_DIR, exist_ok=True)
+PUBLIC_ROOT = os.path.realpath(PUBLIC_DIR)
 
-# Create a simple HTML file for testing
-with open(os.path.join(PUBLIC_DIR, "test.html"), "w") as f:
-    f.write("""
+# Content types that take precedence over the mimetypes table
+EXT_TO_CT = {
+    '.html': 'text/html',
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+}
+
+# Read the system MIME type tables once at startup
+mimetypes.init()
+
+@lru_cache(maxsize=256)
+def content_type_for_ext(ext):
+    """Map a lowercased file extension to a Content-Type"""
+    return EXT_TO_CT.get(ext) or mimetypes.types_map.get(ext) or 'application/octet-stream'
+
+# Create a simple HTML file for testing if it doesn't exist
+if not os.path.exists(os.path.join(PUBLIC_DIR, "test.html")):
+    with open(os.path.join(PUBLIC_DIR, "test.html"), "w") as f:
+        f.write("""
 <!DOCTYPE html>
 <html>
 <head>
@@ -76,25 +100,22 @@ class SimpleHandler(BaseHTTPRequestHandler):
             self.wfile.write(json.dumps(response).encode('utf-8'))
         elif self.path.startswith('/public/'):
             # Serve a static file from the public directory
-            file_path = os.path.join(os.getcwd(), self.path[1:])  # Remove leading /
-            if os.path.exists(file_path) and os.path.isfile(file_path):
-                self.send_response(200)
-                
-                # Determine content type based on file extension
-                if file_path.endswith('.html'):
-                    self.send_header('Content-type', 'text/html')
-                elif file_path.endswith('.css'):
-                    self.send_header('Content-type', 'text/css')
-                elif file_path.endswith('.js'):
-                    self.send_header('Content-type', 'application/javascript')
-                else:
-                    self.send_header('Content-type', 'text/plain')
-                
-                self.end_headers()
-                
-                # Read and send the file
+            file_path = os.path.realpath(os.path.join(PUBLIC_ROOT, self.path[len('/public/'):]))
+            if file_path.startswith(PUBLIC_ROOT + os.sep) and os.path.isfile(file_path):
+                # The with block also covers the header writes, so a client
+                # disconnecting mid-response can't leak the descriptor
                 with open(file_path, 'rb') as f:
-                    self.wfile.write(f.read())
+                    self.send_response(200)
+                    self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+                    
+                    # Determine content type based on file extension
+                    content_type = content_type_for_ext(os.path.splitext(file_path)[1].lower())
+                    self.send_header('Content-type', content_type)
+                    
+                    self.end_headers()
+                    
+                    # Let the kernel copy the file to the socket
+                    self.connection.sendfile(f)
             else:
                 # File not found
                 self.send_response(404)
@@ -108,27 +129,67 @@ class SimpleHandler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(b'Not found')
 
-def run_server():
-    """Start the HTTP server"""
-    server = HTTPServer((HOST, PORT), SimpleHandler)
-    print(f"Server started at http://{HOST}:{PORT}")
+class ReusePortServer(ThreadingHTTPServer):
+    """Threaded HTTP server whose port can be bound by several worker processes"""
+    daemon_threads = True
+    # socketserver's default backlog of 5 drops connections under concurrent load
+    request_queue_size = 1024
+    
+    def server_bind(self):
+        if hasattr(socket, "SO_REUSEPORT"):
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+def serve():
+    """Run one worker's HTTP server until interrupted"""
+    server = ReusePortServer((HOST, PORT), SimpleHandler)
     
     try:
         server.serve_forever()
     except KeyboardInterrupt:
-        print("Server stopped.")
+        pass
     finally:
         server.server_close()
 
+def run_server():
+    """Start the HTTP server, forking extra workers where SO_REUSEPORT is available"""
+    workers = WORKERS if hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT") else 1
+    children = []
+    
+    for _ in range(workers - 1):
+        pid = os.fork()
+        if pid == 0:
+            serve()
+            os._exit(0)
+        children.append(pid)
+    
+    print(f"Server started at http://{HOST}:{PORT} with {workers} worker process(es)")
+    try:
+        serve()
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        print("Server stopped.")
+
 if __name__ == "__main__":
-    print("\nSimple HTTP Server")
-    print("=================")
-    print(f"Server running at http://{HOST}:{PORT}")
-    print("\nAvailable Routes:")
-    print(f"  - GET  http://{HOST}:{PORT}/             - Home page")
-    print(f"  - GET  http://{HOST}:{PORT}/test         - Test route")
-    print(f"  - GET  http://{HOST}:{PORT}/api          - API route")
-    print(f"  - GET  http://{HOST}:{PORT}/public/test.html - Static file")
+    # Build the banner up front so it goes out as one write
+    sys.stdout.write("\n".join([
+        "",
+        "Simple HTTP Server",
+        "=================",
+        f"Server running at http://{HOST}:{PORT}",
+        "",
+        "Available Routes:",
+        f"  - GET  http://{HOST}:{PORT}/             - Home page",
+        f"  - GET  http://{HOST}:{PORT}/test         - Test route",
+        f"  - GET  http://{HOST}:{PORT}/api          - API route",
+        f"  - GET  http://{HOST}:{PORT}/public/test.html - Static file",
+        "",
+    ]))
+    sys.stdout.flush()
     
     # Run the server
     run_server() 
\ No newline at end of file
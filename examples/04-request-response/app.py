@@ -6,11 +6,166 @@ This example demonstrates various features of the Request and Response objects i
 - Response object: Setting status codes, headers, and sending different response types
 """
 
+from functools import lru_cache
+import gzip
+import hashlib
+import os
+import sys
+
 from expressify import expressify
+from expressify.lib.response import APPLICATION_JSON, dumps
+
+# Brotli is optional; without it the HTML pages are offered as gzip only
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Header names used as lookup keys, interned to match the names Expressify stores
+H_HOST = sys.intern('host')
+H_USER_AGENT = sys.intern('user-agent')
+H_CONTENT_TYPE = sys.intern('content-type')
+H_ACCEPT_ENCODING = sys.intern('accept-encoding')
+H_IF_NONE_MATCH = sys.intern('if-none-match')
 
 # Create a new Expressify application
 app = expressify()
 
+# ------------------------------------------------------------
+# Response Bodies
+# ------------------------------------------------------------
+
+# Directory holding the page, stylesheet and script bodies served below
+BODIES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_body(filename):
+    """Read a response body from a file next to this script, once at startup"""
+    with open(os.path.join(BODIES_DIR, filename), 'rb') as f:
+        return f.read()
+
+# Fixed bodies are loaded once at import instead of on every request
+HOME_HTML_BYTES = load_body('home.html')
+HTML_RESPONSE_BYTES = load_body('html_response.html')
+CONTENT_TYPES_HTML_BYTES = load_body('content_types.html')
+CONTENT_TYPES_XML_BYTES = load_body('example.xml')
+CONTENT_TYPES_CSS_BYTES = load_body('example.css')
+CONTENT_TYPES_JS_BYTES = load_body('example.js')
+CONTENT_TYPES_JSON_BYTES = b'{"message": "This is JSON content", "format": "application/json"}'
+
+# Constant JSON payloads are serialized once rather than by res.json() per request
+JSON_RESPONSE_BODY = dumps({
+    'message': 'This is a JSON response',
+    'framework': 'Expressify',
+    'timestamp': '2023-03-26T12:34:56Z',
+    'items': [
+        {'id': 1, 'name': 'Item 1'},
+        {'id': 2, 'name': 'Item 2'},
+        {'id': 3, 'name': 'Item 3'}
+    ]
+})
+
+STATUS_BODY = dumps({
+    'message': 'This response has a 201 Created status code',
+    'status_code': 201,
+    'note': 'Check the network tab in your browser\'s developer tools'
+})
+
+HEADERS_DEMO_BODY = dumps({
+    'message': 'This response includes custom headers',
+    'note': 'Check the network tab in your browser\'s developer tools, or use curl -v'
+})
+
+# Fixed target of /redirect and the body res.redirect() would build for it
+REDIRECT_LOCATION = '/'
+REDIRECT_BODY = f'Redirecting to {REDIRECT_LOCATION}'.encode('utf-8')
+
+# Custom headers added by /headers-demo, applied with one update
+HEADERS_DEMO_EXTRA = (
+    ('X-Custom-Header', 'Custom Value'),
+    ('X-Powered-By', 'Expressify'),
+    ('X-Demo', 'Custom Headers Example'),
+)
+
+# ?type= value -> (Content-Type, body) for the /content-types example; html is sent precompressed
+CONTENT_TYPES_TABLE = {
+    'text': ('text/plain', b'This is plain text content'),
+    'json': (APPLICATION_JSON, CONTENT_TYPES_JSON_BYTES),
+    'xml': ('application/xml', CONTENT_TYPES_XML_BYTES),
+    'css': ('text/css', CONTENT_TYPES_CSS_BYTES),
+    'js': ('application/javascript', CONTENT_TYPES_JS_BYTES),
+    'custom': ('application/x-custom-type', b'This is a custom content type example'),
+}
+
+UNKNOWN_CONTENT_TYPE = ('text/plain', b'Unknown content type requested')
+
+def precompress(body):
+    """
+    Compress a fixed HTML body once at startup
+    Returns (body, ETag) pairs for the identity, gzip and brotli (or None) encodings;
+    each encoding is its own representation, so each gets its own ETag
+    """
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    br = (brotli.compress(body, quality=11), etag[:-1] + '-br"') if brotli else None
+    return (body, etag), (gzip.compress(body, 9), etag[:-1] + '-gz"'), br
+
+HOME_PAGE = precompress(HOME_HTML_BYTES)
+HTML_RESPONSE_PAGE = precompress(HTML_RESPONSE_BYTES)
+CONTENT_TYPES_PAGE = precompress(CONTENT_TYPES_HTML_BYTES)
+
+@lru_cache(maxsize=256)
+def accepted_encodings(accept_encoding):
+    """
+    Parse an Accept-Encoding header into the set of codings the client accepts
+    Codings listed with q=0 are refused; '*' stands for any coding not refused
+    """
+    accepted = set()
+    refused = set()
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        (accepted if q > 0 else refused).add(coding.strip().lower())
+    
+    if '*' in accepted:
+        accepted |= {'br', 'gzip'} - refused
+    return frozenset(accepted)
+
+def send_page(req, res, page):
+    """Send a precompressed HTML page in the best encoding the client accepts"""
+    identity, gzipped, br = page
+    headers = req.headers
+    # Clients send only a handful of distinct headers, so parsing is cached
+    accepted = accepted_encodings(headers.get(H_ACCEPT_ENCODING, ''))
+    if br is not None and 'br' in accepted:
+        encoding = 'br'
+        body, etag = br
+    elif 'gzip' in accepted:
+        encoding = 'gzip'
+        body, etag = gzipped
+    else:
+        encoding = None
+        body, etag = identity
+    
+    # A 304 carries the same Content-Type as the page, caches copy it onto their stored copy
+    res.type('text/html')
+    res.headers['ETag'] = etag
+    res.headers['Vary'] = 'Accept-Encoding'
+    
+    # The client's cached copy of this encoding is current, so skip the body
+    if headers.get(H_IF_NONE_MATCH) == etag:
+        res.status(304).send(b'')
+        return
+    
+    if encoding is not None:
+        res.headers['Content-Encoding'] = encoding
+    res.send(body)
+
 # ------------------------------------------------------------
 # Request Object Examples
 # ------------------------------------------------------------
@@ -19,116 +174,26 @@ app = expressify()
 @app.get('/')
 def home(req, res):
     """Home route with links to examples"""
-    res.type('html').send('''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Expressify Request/Response Examples</title>
-        <style>
-            body { font-family: Arial, sans-serif; margin: 40px; line-height: 1.6; }
-            h1, h2 { color: #0066cc; }
-            .container { max-width: 800px; margin: 0 auto; }
-            ul { margin-bottom: 20px; }
-            pre { background: #f4f4f4; padding: 10px; border-radius: 5px; }
-            .card { border: 1px solid #ddd; border-radius: 5px; padding: 15px; margin-bottom: 15px; }
-            .method { display: inline-block; padding: 3px 6px; border-radius: 3px; color: white; font-size: 12px; }
-            .get { background-color: #5cb85c; }
-            .post { background-color: #f0ad4e; }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>Expressify Request and Response Examples</h1>
-            <p>This example demonstrates how to work with Request and Response objects in Expressify.</p>
-            
-            <div class="card">
-                <h2>Request Object Examples</h2>
-                <ul>
-                    <li><a href="/request-info"><span class="method get">GET</span> /request-info</a> - Shows basic request information</li>
-                    <li><a href="/query-params?name=John&age=30"><span class="method get">GET</span> /query-params?name=John&age=30</a> - Demonstrates query parameters</li>
-                    <li><a href="/headers"><span class="method get">GET</span> /headers</a> - Shows request headers</li>
-                    <li><span class="method post">POST</span> /handle-form - Process form data (see form below)</li>
-                    <li><a href="/params/42"><span class="method get">GET</span> /params/42</a> - URL parameters</li>
-                </ul>
-            </div>
-            
-            <div class="card">
-                <h2>Response Object Examples</h2>
-                <ul>
-                    <li><a href="/text"><span class="method get">GET</span> /text</a> - Plain text response</li>
-                    <li><a href="/html"><span class="method get">GET</span> /html</a> - HTML response</li>
-                    <li><a href="/json"><span class="method get">GET</span> /json</a> - JSON response</li>
-                    <li><a href="/status"><span class="method get">GET</span> /status</a> - Custom status code (201)</li>
-                    <li><a href="/headers-demo"><span class="method get">GET</span> /headers-demo</a> - Custom response headers</li>
-                    <li><a href="/redirect"><span class="method get">GET</span> /redirect</a> - Redirect response</li>
-                    <li><a href="/content-types"><span class="method get">GET</span> /content-types</a> - Content-Type examples</li>
-                </ul>
-            </div>
-            
-            <div class="card">
-                <h2>Test Form Submission</h2>
-                <form action="/handle-form" method="post">
-                    <div style="margin-bottom: 10px;">
-                        <label for="name">Name:</label>
-                        <input type="text" id="name" name="name" required style="width: 100%; padding: 8px; margin-top: 5px;">
-                    </div>
-                    <div style="margin-bottom: 10px;">
-                        <label for="email">Email:</label>
-                        <input type="email" id="email" name="email" required style="width: 100%; padding: 8px; margin-top: 5px;">
-                    </div>
-                    <div style="margin-bottom: 10px;">
-                        <label for="message">Message:</label>
-                        <textarea id="message" name="message" rows="4" style="width: 100%; padding: 8px; margin-top: 5px;"></textarea>
-                    </div>
-                    <button type="submit" style="background-color: #0066cc; color: white; border: none; padding: 10px 15px; border-radius: 5px; cursor: pointer;">Submit</button>
-                </form>
-            </div>
-            
-            <div class="card">
-                <h2>Testing with cURL</h2>
-                <pre>
-# Get request info
-curl http://localhost:3000/request-info
-
-# Query parameters
-curl http://localhost:3000/query-params?name=John&age=30
-
-# Get request headers
-curl http://localhost:3000/headers
-
-# Submit form data
-curl -X POST -d "name=John&email=john@example.com&message=Hello" http://localhost:3000/handle-form
-
-# URL parameters
-curl http://localhost:3000/params/42
-
-# Response examples
-curl http://localhost:3000/text
-curl http://localhost:3000/html
-curl http://localhost:3000/json
-curl http://localhost:3000/status
-curl -v http://localhost:3000/headers-demo
-curl -v http://localhost:3000/redirect
-                </pre>
-            </div>
-        </div>
-    </body>
-    </html>
-    ''')
+    send_page(req, res, HOME_PAGE)
 
 # Request information
 @app.get('/request-info')
 def request_info(req, res):
     """Shows basic information about the request"""
+    # Attributes used more than once are read into locals first
+    headers = req.headers
+    protocol = req.protocol
+    path = req.path
+    host = headers.get(H_HOST, '')
     info = {
         'method': req.method,
-        'path': req.path,
-        'protocol': req.protocol,
-        'host': req.headers.get('host', ''),
-        'user_agent': req.headers.get('user-agent', ''),
-        'content_type': req.headers.get('content-type', ''),
-        'query_params': dict(req.query),
-        'url': f"{req.protocol}://{req.headers.get('host', '')}{req.path}"
+        'path': path,
+        'protocol': protocol,
+        'host': host,
+        'user_agent': headers.get(H_USER_AGENT, ''),
+        'content_type': headers.get(H_CONTENT_TYPE, ''),
+        'query_params': req.query,
+        'url': ''.join((protocol, '://', host, path))
     }
     
     res.json(info)
@@ -137,14 +202,15 @@ def request_info(req, res):
 @app.get('/query-params')
 def query_params(req, res):
     """Demonstrates how to access query parameters"""
-    name = req.query.get('name', 'Guest')
-    age = req.query.get('age', 'Unknown')
+    query = req.query
+    name = query.get('name', 'Guest')
+    age = query.get('age', 'Unknown')
     
     res.json({
         'message': f'Hello, {name}!',
         'name': name,
         'age': age,
-        'all_params': dict(req.query),
+        'all_params': query,
         'tip': 'Try adding different query parameters to the URL'
     })
 
@@ -152,29 +218,38 @@ def query_params(req, res):
 @app.get('/headers')
 def headers(req, res):
     """Shows all request headers"""
-    headers_dict = {name: value for name, value in req.headers.items()}
-    
+    # req.headers is already a plain dict, so it is serialized without a copy
     res.json({
         'message': 'Request Headers',
-        'headers': headers_dict
+        'headers': req.headers
     })
 
 # Form handling example
 @app.post('/handle-form')
 def handle_form(req, res):
     """Process form data from POST request"""
-    name = req.body.get('name', '')
-    email = req.body.get('email', '')
-    message = req.body.get('message', '')
+    # req.body is a property that parses on first use; read it once
+    body = req.body
     
     res.json({
         'message': 'Form submission received',
         'data': {
-            'name': name,
-            'email': email,
-            'message': message
+            'name': body.get('name', ''),
+            'email': body.get('email', ''),
+            'message': body.get('message', '')
         },
-        'all_form_data': dict(req.body)
+        'all_form_data': body
+    })
+
+# Serialized bodies for recently requested IDs; bounded so arbitrary IDs can't grow it forever
+@lru_cache(maxsize=1024)
+def render_param(param_id):
+    """Build the /params/:id JSON body for one ID"""
+    return dumps({
+        'message': f'You requested item {param_id}',
+        'id': param_id,
+        'all_params': {'id': param_id},
+        'tip': 'Try changing the ID in the URL'
     })
 
 # URL parameters example
@@ -183,190 +258,58 @@ def url_params(req, res):
     """Demonstrates URL parameters"""
     param_id = req.params.get('id', 'unknown')
     
-    res.json({
-        'message': f'You requested item {param_id}',
-        'id': param_id,
-        'all_params': dict(req.params),
-        'tip': 'Try changing the ID in the URL'
-    })
+    # The route has no other parameters, so the body depends on the ID alone
+    res.type(APPLICATION_JSON).send(render_param(param_id))
 
 # ------------------------------------------------------------
 # Response Object Examples
 # ------------------------------------------------------------
 
 # Plain text response
-@app.get('/text')
-def text_response(req, res):
-    """Sends a plain text response"""
-    res.type('text/plain').send('This is a plain text response from Expressify')
+# Responses that never change are registered with app.fixed(), which builds them
+# once and sends them without calling a handler
+app.fixed('/text', 200, [('Content-Type', 'text/plain')], b'This is a plain text response from Expressify')
 
 # HTML response
 @app.get('/html')
 def html_response(req, res):
     """Sends an HTML response"""
-    res.type('text/html').send('''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>HTML Response</title>
-        <style>
-            body { font-family: Arial, sans-serif; margin: 40px; text-align: center; }
-            h1 { color: #0066cc; }
-            .container { max-width: 600px; margin: 0 auto; }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>HTML Response</h1>
-            <p>This is an HTML response from Expressify.</p>
-            <p><a href="/">Back to Examples</a></p>
-        </div>
-    </body>
-    </html>
-    ''')
+    send_page(req, res, HTML_RESPONSE_PAGE)
 
 # JSON response
-@app.get('/json')
-def json_response(req, res):
-    """Sends a JSON response"""
-    data = {
-        'message': 'This is a JSON response',
-        'framework': 'Expressify',
-        'timestamp': '2023-03-26T12:34:56Z',
-        'items': [
-            {'id': 1, 'name': 'Item 1'},
-            {'id': 2, 'name': 'Item 2'},
-            {'id': 3, 'name': 'Item 3'}
-        ]
-    }
-    
-    res.json(data)
+app.fixed('/json', 200, [('Content-Type', APPLICATION_JSON)], JSON_RESPONSE_BODY)
 
 # Status code example
 @app.get('/status')
 def status_code(req, res):
     """Demonstrates setting a custom status code"""
-    res.status(201).json({
-        'message': 'This response has a 201 Created status code',
-        'status_code': 201,
-        'note': 'Check the network tab in your browser\'s developer tools'
-    })
+    res.status(201).type(APPLICATION_JSON).send(STATUS_BODY)
 
 # Custom headers example
 @app.get('/headers-demo')
 def headers_demo(req, res):
     """Demonstrates setting custom response headers"""
-    res.headers['X-Custom-Header'] = 'Custom Value'
-    res.headers['X-Powered-By'] = 'Expressify'
-    res.headers['X-Demo'] = 'Custom Headers Example'
-    
-    res.json({
-        'message': 'This response includes custom headers',
-        'note': 'Check the network tab in your browser\'s developer tools, or use curl -v'
-    })
+    res.extend_headers(HEADERS_DEMO_EXTRA)
+    res.type(APPLICATION_JSON).send(HEADERS_DEMO_BODY)
 
-# Redirect example
-@app.get('/redirect')
-def redirect_demo(req, res):
-    """Demonstrates a redirect response"""
-    res.redirect('/')
+# Redirect example, the same response res.redirect('/') sends
+app.fixed('/redirect', 302, [('Location', REDIRECT_LOCATION)], REDIRECT_BODY)
 
 # Content-Type examples
 @app.get('/content-types')
 def content_types(req, res):
     """Demonstrates different content types using res.type()"""
-    content_type = req.query.get('type', 'html')
-    
-    if content_type == 'text':
-        res.type('text/plain').send('This is plain text content')
+    requested = req.query.get('type', 'html')
     
-    elif content_type == 'html':
-        res.type('text/html').send('''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Content-Type Example</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 40px; }
-                h1 { color: #0066cc; }
-                .container { max-width: 800px; margin: 0 auto; }
-                .code { font-family: monospace; background: #f4f4f4; padding: 3px; }
-                .examples { display: flex; flex-wrap: wrap; gap: 10px; margin-top: 20px; }
-                .example { padding: 8px 15px; background: #eee; border-radius: 5px; text-decoration: none; color: #333; }
-                .example:hover { background: #ddd; }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>Content-Type Examples</h1>
-                <p>This example demonstrates using <span class="code">res.type()</span> to set different content types.</p>
-                <p>Current content type: <span class="code">text/html</span></p>
-                
-                <div class="examples">
-                    <a href="/content-types?type=text" class="example">text/plain</a>
-                    <a href="/content-types?type=html" class="example">text/html</a>
-                    <a href="/content-types?type=json" class="example">application/json</a>
-                    <a href="/content-types?type=xml" class="example">application/xml</a>
-                    <a href="/content-types?type=css" class="example">text/css</a>
-                    <a href="/content-types?type=js" class="example">application/javascript</a>
-                    <a href="/content-types?type=custom" class="example">custom/type</a>
-                </div>
-                
-                <p><a href="/">Back to Examples</a></p>
-            </div>
-        </body>
-        </html>
-        ''')
+    if requested == 'html':
+        send_page(req, res, CONTENT_TYPES_PAGE)
+        return
     
-    elif content_type == 'json':
-        res.type('application/json').send('{"message": "This is JSON content", "format": "application/json"}')
-    
-    elif content_type == 'xml':
-        res.type('application/xml').send('''<?xml version="1.0" encoding="UTF-8"?>
-<root>
-  <message>This is XML content</message>
-  <format>application/xml</format>
-</root>''')
-    
-    elif content_type == 'css':
-        res.type('text/css').send('''
-body {
-  font-family: Arial, sans-serif;
-  background-color: #f0f0f0;
-  color: #333;
-}
-
-h1 {
-  color: #0066cc;
-  border-bottom: 1px solid #ddd;
-  padding-bottom: 10px;
-}
-
-.container {
-  max-width: 800px;
-  margin: 0 auto;
-  padding: 20px;
-}
-''')
-    
-    elif content_type == 'js':
-        res.type('application/javascript').send('''
-function greeting(name) {
-  return `Hello, ${name}!`;
-}
-
-console.log(greeting('Expressify User'));
-
-document.addEventListener('DOMContentLoaded', () => {
-  console.log('Document loaded');
-});
-''')
-    
-    elif content_type == 'custom':
-        res.type('application/x-custom-type').send('This is a custom content type example')
-    
-    else:
-        res.type('text/plain').send('Unknown content type requested')
+    # A repeated ?type= arrives as a list, which is never a known type
+    if not isinstance(requested, str):
+        requested = None
+    content_type, body = CONTENT_TYPES_TABLE.get(requested, UNKNOWN_CONTENT_TYPE)
+    res.type(content_type).send(body)
 
 # ------------------------------------------------------------
 # Start the Server
@@ -0,0 +1,10 @@
+
+function greeting(name) {
+  return `Hello, ${name}!`;
+}
+
+console.log(greeting('Expressify User'));
+
+document.addEventListener('DOMContentLoaded', () => {
+  console.log('Document loaded');
+});
@@ -1,12 +1,30 @@
-import inspect
+import os
+import sys
 import traceback
-import json
 from typing import Dict, List, Callable, Any, Optional, Union, Tuple
 
 from expressify.lib.request import Request
-from expressify.lib.response import Response
-from expressify.lib.middleware import Middleware
-from expressify.lib.router import Router
+from expressify.lib.response import BODYLESS_STATUSES, Response
+from expressify.lib.middleware import Middleware, compile_chain, run_chain
+from expressify.lib.router import Router, HTTP_METHODS
+
+# Interned names of common request headers, so they are not decoded per request
+# and lookups with sys.intern()'d keys match on identity
+HEADER_NAMES = {name.encode('latin-1'): sys.intern(name) for name in (
+    'host', 'user-agent', 'accept', 'accept-encoding', 'accept-language', 'connection',
+    'content-type', 'content-length', 'cookie', 'authorization', 'origin', 'referer',
+    'if-none-match', 'if-modified-since', 'x-forwarded-for', 'x-forwarded-proto',
+)}
+
+# Methods whose request body is read before dispatch
+BODY_METHODS = frozenset({'POST', 'PUT', 'PATCH'})
+
+# Bytes per body message when streaming a file from res.send_file()
+FILE_CHUNK_SIZE = 64 * 1024
+
+def not_found(req, res):
+    """Final step for requests that match no route"""
+    res.status(404).send(f"Cannot {req.method} {req.path}")
 
 class Application(Router):
     """
@@ -17,6 +35,48 @@ class Application(Router):
         super().__init__()
         self.settings = {}
         self.server = None
+        # Middleware steps compiled on first request, reset whenever use() is called
+        self._chain = None
+        # Route handler -> app chain followed by that route's middleware
+        self._route_chains = {}
+        # (method, path) -> prebuilt (start, body) messages registered with fixed()
+        self._fixed_responses = {}
+        
+    def use(self, path_or_middleware=None, middleware=None):
+        """Mount middleware or routers and invalidate the compiled middleware chain"""
+        self._chain = None
+        return super().use(path_or_middleware, middleware)
+        
+    def fixed(self, path: str, status: int = 200, headers=None, body: Union[str, bytes] = b''):
+        """
+        Register a GET route that always sends the same response
+        The ASGI messages are built once here; while no middleware is mounted
+        they are sent as-is without creating a request or response object
+        """
+        if ':' in path or '*' in path:
+            raise ValueError(f"Fixed responses need a literal path, got '{path}'")
+            
+        response = Response().status(status).extend_headers(headers or ()).send(body)
+        
+        def handler(req, res):
+            res.status(status).extend_headers(response.headers).send(response.body)
+            
+        full_path = path if path.startswith('/') else f'/{path}'
+        # Like other routes, the first registration for a path wins
+        if ('GET', full_path) not in self.static_routes:
+            self._fixed_responses[('GET', full_path)] = (
+                {
+                    "type": "http.response.start",
+                    "status": status,
+                    "headers": response.raw_headers(len(response.body)),
+                },
+                {
+                    "type": "http.response.body",
+                    "body": response.body,
+                    "more_body": False,
+                },
+            )
+        return self.get(full_path, handler)
         
     def set(self, setting: str, value: Any):
         """Configure application settings"""
@@ -31,9 +91,19 @@ class Application(Router):
             return
             
         # Parse request information
-        method = scope["method"]
+        method = HTTP_METHODS.get(scope["method"], scope["method"])
         path = scope["path"]
-        headers = dict([(k.decode('utf-8'), v.decode('utf-8')) for k, v in scope["headers"]])
+        
+        # Fixed responses skip request parsing and the handler entirely
+        fixed = self._fixed_responses.get((method, path))
+        if fixed is not None and not self.middleware:
+            await send(fixed[0])
+            await send(fixed[1])
+            return
+            
+        # ASGI servers already lowercase header names, decode each pair once;
+        # names are ASCII tokens, values keep utf-8 so non-ASCII text survives
+        headers = {HEADER_NAMES.get(k) or k.decode('latin-1'): v.decode('utf-8') for k, v in scope["headers"]}
         query_string = scope.get("query_string", b"").decode('utf-8')
         
         # Parse query parameters
@@ -43,9 +113,9 @@ class Application(Router):
             parsed_qs = urllib.parse.parse_qs(query_string)
             query = {k: v for k, v in parsed_qs.items()}
         
-        # Receive request body
-        body = None
-        if method in ["POST", "PUT", "PATCH"]:
+        # Receive request body, parsing is deferred until req.body is used
+        raw_body = None
+        if method in BODY_METHODS:
             body_chunks = []
             more_body = True
             
@@ -54,22 +124,7 @@ class Application(Router):
                 body_chunks.append(message.get("body", b""))
                 more_body = message.get("more_body", False)
                 
-            body_data = b"".join(body_chunks)
-            
-            # Parse body based on content type
-            content_type = headers.get("content-type", "")
-            
-            if body_data:
-                if "application/json" in content_type:
-                    try:
-                        body = json.loads(body_data.decode('utf-8'))
-                    except json.JSONDecodeError:
-                        body = body_data.decode('utf-8')
-                elif "application/x-www-form-urlencoded" in content_type:
-                    import urllib.parse
-                    body = urllib.parse.parse_qs(body_data.decode('utf-8'))
-                else:
-                    body = body_data.decode('utf-8')
+            raw_body = b"".join(body_chunks)
         
         # Find matching route
         handler, params = self.find_route(method, path)
@@ -81,103 +136,103 @@ class Application(Router):
             params=params,
             query=query,
             headers=headers,
-            body=body
+            raw_body=raw_body
         )
         
         response = Response()
         
         # Process middleware and handler
         try:
-            middleware_chain = self.middleware.copy()
+            chain = self._chain
+            if chain is None:
+                chain = self._chain = compile_chain(self.middleware)
+                self._route_chains.clear()
             
-            # Add handler as the last step in the chain
-            async def execute_handler():
-                if handler:
-                    if inspect.iscoroutinefunction(handler):
-                        await handler(request, response)
-                    else:
-                        handler(request, response)
-                else:
-                    # No route handler found, send 404
-                    response.status(404).send(f"Cannot {method} {path}")
+            # Run route-specific middleware in the same chain as the app middleware
+            route_steps = getattr(handler, 'middleware_steps', None)
+            if route_steps is not None:
+                route_chain = self._route_chains.get(handler)
+                if route_chain is None:
+                    route_chain = self._route_chains[handler] = chain + route_steps
+                chain = route_chain
+                handler = handler.handler
             
-            # If we have middleware, process it
-            if middleware_chain:
-                async def process_chain(index=0):
-                    if index >= len(middleware_chain):
-                        # End of middleware chain, execute handler
-                        await execute_handler()
-                        return
-                        
-                    middleware_item = middleware_chain[index]
-                    
-                    # Handle both simple middleware and path-specific middleware
-                    middleware_func = middleware_item
-                    middleware_path = None
-                    
-                    # Check if middleware is path-specific
-                    if isinstance(middleware_item, tuple) and len(middleware_item) == 2:
-                        middleware_path, middleware_func = middleware_item
-                        
-                        # Skip if path doesn't match
-                        if not path.startswith(middleware_path):
-                            await process_chain(index + 1)
-                            return
-                    
-                    # Create next function that will call the next middleware
-                    async def next_step():
-                        await process_chain(index + 1)
-                    
-                    # Execute current middleware
-                    if inspect.iscoroutinefunction(middleware_func):
-                        await middleware_func(request, response, next_step)
-                    else:
-                        # Handle non-async middleware
-                        result = middleware_func(request, response, next_step)
-                        # If result is a coroutine, await it
-                        if inspect.iscoroutine(result):
-                            await result
-                
-                # Start the middleware chain
-                await process_chain()
-            else:
-                # No middleware, just execute the handler
-                await execute_handler()
+            # The handler runs as the last step in the chain
+            await run_chain(chain, request, response, handler or not_found)
             
         except Exception as e:
             traceback.print_exc()
             response.status(500).send(f"Internal Server Error: {str(e)}")
         
+        if response.file is not None:
+            await self._send_file(scope, send, response)
+        else:
+            await self._send_body(send, response)
+    
+    async def _send_body(self, send, response: Response):
+        """
+        Send a response whose body is held in memory
+        """
+        # Encode the body up front so Content-Length can be sent with the headers
+        if response.status_code in BODYLESS_STATUSES:
+            response_body = b""
+        elif response.body:
+            if isinstance(response.body, bytes):
+                response_body = response.body
+            elif isinstance(response.body, str):
+                response_body = response.body.encode('utf-8')
+            else:
+                response_body = str(response.body).encode('utf-8')
+        else:
+            response_body = b""
+            
         # Send the response
         await send({
             "type": "http.response.start",
             "status": response.status_code,
-            "headers": [
-                [k.encode('utf-8'), v.encode('utf-8')] 
-                for k, v in response.headers.items()
-            ],
+            "headers": response.raw_headers(len(response_body)),
         })
         
         # Send the response body
-        if response.body:
-            if isinstance(response.body, str):
-                response_body = response.body.encode('utf-8')
-            elif isinstance(response.body, bytes):
-                response_body = response.body
-            else:
-                response_body = str(response.body).encode('utf-8')
-                
-            await send({
-                "type": "http.response.body",
-                "body": response_body,
-                "more_body": False,
-            })
-        else:
+        await send({
+            "type": "http.response.body",
+            "body": response_body,
+            "more_body": False,
+        })
+    
+    async def _send_file(self, scope, send, response: Response):
+        """
+        Stream a file set with res.send_file() without loading it into memory
+        Servers offering the ASGI zero-copy send extension get the open file so
+        they can hand it to os.sendfile, others receive it in chunks
+        """
+        with open(response.file, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
             await send({
-                "type": "http.response.body",
-                "body": b"",
-                "more_body": False,
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": response.raw_headers(size),
             })
+            
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                })
+                return
+                
+            remaining = size
+            while True:
+                chunk = f.read(min(remaining, FILE_CHUNK_SIZE))
+                remaining -= len(chunk)
+                more_body = remaining > 0 and bool(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": more_body,
+                })
+                if not more_body:
+                    break
     
     def listen(self, port, hostname, callback=None):
         """
@@ -188,6 +243,10 @@ class Application(Router):
         - hostname: Required hostname to bind to.
         - callback: Optional callback function to be called after the server starts.
         
+        The event loop can be chosen with app.set('loop', ...): 'uvloop', 'asyncio'
+        or 'auto' (default, uses uvloop when it is installed). Likewise the HTTP
+        parser with app.set('http', ...): 'httptools', 'h11' or 'auto'.
+        
         Returns:
         - The server thread object if running in a separate thread.
         """
@@ -197,9 +256,11 @@ class Application(Router):
         # Convert port to integer if needed
         port = int(port)
         
+        server_options = self._server_options()
+        
         # Create a function to run the server
         def run_server():
-            uvicorn.run(self, host=hostname, port=port)
+            uvicorn.run(self, host=hostname, port=port, **server_options)
             
         # If we're not in the main thread, start in a new thread
         if threading.current_thread() is not threading.main_thread():
@@ -221,7 +282,24 @@ class Application(Router):
             if callback:
                 callback()
                 
-            uvicorn.run(self, host=hostname, port=port)
+            uvicorn.run(self, host=hostname, port=port, **server_options)
+    
+    def _server_options(self) -> Dict[str, str]:
+        """
+        Pick the uvicorn event loop and HTTP parser, preferring the C-accelerated
+        uvloop and httptools implementations when they are installed
+        """
+        options = {}
+        for setting, fast, fallback in (('loop', 'uvloop', 'asyncio'), ('http', 'httptools', 'h11')):
+            value = self.settings.get(setting, 'auto')
+            if value == 'auto':
+                try:
+                    __import__(fast)
+                    value = fast
+                except ImportError:
+                    value = fallback
+            options[setting] = value
+        return options
     
     def close(self):
         """
@@ -1,8 +1,95 @@
-from typing import Callable, Any, Dict, List, Optional
+from typing import Callable, Any, Dict, List, Optional, Tuple
+import inspect
 import time
 import traceback
 
 
+def compile_chain(middleware: List[Any]) -> Tuple[Tuple[Optional[str], Callable, bool], ...]:
+    """
+    Resolve a middleware list into (path prefix, function, is_async) steps once,
+    so per-request dispatch does no tuple unpacking or coroutine checks
+    """
+    steps = []
+    for item in middleware:
+        prefix = None
+        func = item
+        
+        # Path-specific middleware is stored as (path, function)
+        if isinstance(item, tuple) and len(item) == 2:
+            prefix, func = item
+            
+        steps.append((prefix, func, inspect.iscoroutinefunction(func)))
+    return tuple(steps)
+
+
+class ChainRun:
+    """
+    One request's position in a compiled chain
+    The object itself is the next() passed to every step, like Express's single
+    next per request, so running a chain creates no closures
+    """
+    __slots__ = ('steps', 'req', 'res', 'final', 'index')
+    
+    def __init__(self, steps, req, res, final: Callable):
+        self.steps = steps
+        self.req = req
+        self.res = res
+        self.final = final
+        self.index = 0
+        
+    async def __call__(self):
+        """Run the next matching step, or final(req, res) once the steps are exhausted"""
+        steps = self.steps
+        req = self.req
+        res = self.res
+        path = req.path
+        count = len(steps)
+        
+        while self.index < count:
+            prefix, func, is_async = steps[self.index]
+            self.index += 1
+            
+            # Skip path-specific middleware that doesn't match
+            if prefix is not None and not path.startswith(prefix):
+                continue
+                
+            if is_async:
+                await func(req, res, self)
+            else:
+                # Non-async middleware may return the coroutine from next()
+                result = func(req, res, self)
+                if inspect.iscoroutine(result):
+                    await result
+            return
+            
+        result = self.final(req, res)
+        if inspect.iscoroutine(result):
+            await result
+
+
+def run_chain(steps, req, res, final: Callable):
+    """
+    Run compiled middleware steps, then final(req, res), which may be sync or async
+    Returns a coroutine to await
+    """
+    return ChainRun(steps, req, res, final)()
+
+
+def with_middleware(middleware: List[Callable], handler: Callable) -> Callable:
+    """
+    Wrap a route handler with route-specific middleware, compiled once at registration
+    """
+    steps = compile_chain(middleware)
+    
+    async def route_handler(req, res):
+        await run_chain(steps, req, res, handler)
+        
+    # Exposed so the application can append the steps to its own chain
+    route_handler.middleware_steps = steps
+    route_handler.handler = handler
+    return route_handler
+
+
 class Middleware:
     """
     Middleware class with common middleware functions
@@ -47,15 +134,16 @@ class Middleware:
         if headers is None:
             headers = ['Content-Type', 'Authorization']
             
+        # Join the header values once, not on every request
+        cors_headers = {
+            'Access-Control-Allow-Origin': ','.join(origins) if isinstance(origins, list) else origins,
+            'Access-Control-Allow-Methods': ','.join(methods),
+            'Access-Control-Allow-Headers': ','.join(headers),
+        }
+            
         async def cors_middleware(req, res, next):
             # Set CORS headers
-            if isinstance(origins, list):
-                res.set('Access-Control-Allow-Origin', ','.join(origins))
-            else:
-                res.set('Access-Control-Allow-Origin', origins)
-                
-            res.set('Access-Control-Allow-Methods', ','.join(methods))
-            res.set('Access-Control-Allow-Headers', ','.join(headers))
+            res.extend_headers(cors_headers)
             
             # Handle OPTIONS request for preflight
             if req.method == 'OPTIONS':
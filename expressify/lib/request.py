@@ -1,5 +1,17 @@
+import json
+import time
 from typing import Dict, Any, Optional, Union, List
-from urllib.parse import urlparse
+from urllib.parse import parse_qs
+
+# Use orjson when it is installed for parsing JSON bodies
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+# Marks a body that has been received but not parsed yet
+_UNPARSED = object()
 
 
 class Request:
@@ -9,26 +21,78 @@ class Request:
     """
     
     def __init__(self, method: str, path: str, params: Dict[str, str], query: Dict[str, list],
-                 headers: Dict[str, str], body: Any = None):
+                 headers: Dict[str, str], body: Any = None, raw_body: Optional[bytes] = None):
         self.method = method
         self.path = path
+        # Monotonic time the request was received, shared by middleware measuring durations
+        self.start_time = time.monotonic()
         self.params = params  # URL parameters
         self.query = self._flatten_query(query)  # Query parameters
         self.headers = headers  # HTTP headers (lowercased)
-        self.body = body  # Request body
+        self.raw_body = raw_body  # Unparsed request body bytes
+        # Request body, parsed from raw_body on first access
+        self._body = _UNPARSED if body is None and raw_body else body
+        self._json = _UNPARSED
         self.cookies = self._parse_cookies()
         self.originalUrl = path  # Original URL, like Express
         
-        # Parse URL components
-        parsed_url = urlparse(path)
+        # URL components
         self.baseUrl = ""  # Will be set by router if path is mounted
         self.url = path
-        self.hostname = headers.get('host', '').split(':')[0]
-        self.port = headers.get('host', '').split(':')[1] if ':' in headers.get('host', '') else None
+        hostname, _, port = headers.get('host', '').partition(':')
+        self.hostname = hostname
+        self.port = port or None
         self.protocol = headers.get('x-forwarded-proto', 'http')
         self.secure = self.protocol == 'https'
         self.ip = headers.get('x-forwarded-for', headers.get('remote-addr', ''))
         
+    @property
+    def body(self) -> Any:
+        """
+        Request body parsed according to its Content-Type
+        Parsing happens on first access so handlers that ignore the body skip it
+        """
+        if self._body is _UNPARSED:
+            self._body = self._parse_body()
+        return self._body
+    
+    @body.setter
+    def body(self, value: Any):
+        self._body = value
+    
+    @property
+    def json(self) -> Any:
+        """
+        Request body parsed as JSON, or None when the request is not JSON
+        Raises ValueError if the body is not valid JSON
+        """
+        if self._json is _UNPARSED:
+            if self.raw_body and self.is_json():
+                self._json = loads(self.raw_body)
+            else:
+                self._json = None
+        return self._json
+    
+    @json.setter
+    def json(self, value: Any):
+        self._json = value
+    
+    def _parse_body(self) -> Any:
+        """
+        Parse the raw body based on the Content-Type header
+        """
+        content_type = self.headers.get('content-type', '')
+        
+        if 'application/json' in content_type:
+            try:
+                return self.json
+            except ValueError:
+                return self.raw_body.decode('utf-8')
+        elif 'application/x-www-form-urlencoded' in content_type:
+            return parse_qs(self.raw_body.decode('utf-8'))
+        
+        return self.raw_body.decode('utf-8')
+    
     def _flatten_query(self, query: Dict[str, list]) -> Dict[str, Union[str, list]]:
         """
         Flatten query parameters that have a single value
@@ -74,8 +138,11 @@ class Request:
         Get a request header (case-insensitive)
         Similar to Express's req.get()
         """
-        name = name.lower()
-        return self.headers.get(name, default)
+        # Header names are stored lowercased, so try the name as given first
+        value = self.headers.get(name)
+        if value is None:
+            value = self.headers.get(name.lower(), default)
+        return value
     
     def is_json(self) -> bool:
         """
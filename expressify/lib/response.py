@@ -1,7 +1,41 @@
 import json
+import os
 from typing import Dict, Any, Optional, Union, List
 import datetime
 
+APPLICATION_JSON = 'application/json'
+
+# Statuses sent without a body; a Content-Length on them would describe the
+# full representation, so none is added
+BODYLESS_STATUSES = frozenset({204, 304})
+
+def _json_dumps(data: Any) -> bytes:
+    """Encode JSON with the standard library"""
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+# Use orjson when it is installed, it encodes straight to bytes
+try:
+    import orjson
+    
+    def dumps(data: Any) -> bytes:
+        """
+        Encode JSON with orjson, falling back to the standard library for data it rejects
+        Only data with non-string keys pays for the slower OPT_NON_STR_KEYS path, and values
+        orjson can't encode, such as integers beyond 64 bits, are encoded by json.dumps.
+        Unlike json.dumps, orjson writes NaN and Infinity as null, which is valid JSON
+        """
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            pass
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return _json_dumps(data)
+except ImportError:
+    orjson = None
+    dumps = _json_dumps
+
 
 class Response:
     """
@@ -15,6 +49,8 @@ class Response:
             'Content-Type': 'text/plain',
         }
         self.body = None
+        # Path of a file to stream as the body, set by send_file()
+        self.file = None
         self._is_sent = False
     
     def status(self, code: int):
@@ -31,6 +67,19 @@ class Response:
         self.headers[header] = value
         return self
     
+    def set_header(self, header: str, value: str):
+        """
+        Set an HTTP header (alias of set)
+        """
+        return self.set(header, value)
+    
+    def extend_headers(self, headers: Dict[str, str]):
+        """
+        Set several HTTP headers at once from a dict or (name, value) pairs
+        """
+        self.headers.update(headers)
+        return self
+    
     def append(self, header: str, value: str):
         """
         Append to an HTTP header
@@ -46,6 +95,28 @@ class Response:
             self.headers[header] = value
         return self
     
+    def raw_headers(self, content_length: int) -> List[List[bytes]]:
+        """
+        Encode the headers in one pass for the ASGI response start message
+        Headers set more than once with append() are sent as separate lines,
+        and a Content-Length set by the handler is sent instead of content_length.
+        204 and 304 responses get no computed Content-Length
+        """
+        raw = []
+        has_length = False
+        for header, value in self.headers.items():
+            name = header.encode('utf-8')
+            if name.lower() == b'content-length':
+                has_length = True
+            # Values such as numbers are sent in their str() form
+            if isinstance(value, list):
+                raw.extend([name, str(item).encode('utf-8')] for item in value)
+            else:
+                raw.append([name, str(value).encode('utf-8')])
+        if not has_length and self.status_code not in BODYLESS_STATUSES:
+            raw.append([b'content-length', str(content_length).encode('latin-1')])
+        return raw
+    
     def type(self, content_type: str):
         """
         Set the Content-Type header
@@ -56,9 +127,10 @@ class Response:
     def json(self, data: Any):
         """
         Send a JSON response
+        Sets the Content-Type itself, so there is no need to call type() first
         """
-        self.headers['Content-Type'] = 'application/json'
-        self.body = json.dumps(data).encode('utf-8')
+        self.headers['Content-Type'] = APPLICATION_JSON
+        self.body = dumps(data)
         self._is_sent = True
         return self
     
@@ -69,6 +141,12 @@ class Response:
         if self._is_sent:
             raise RuntimeError('Response already sent')
             
+        # Pre-encoded bodies skip all conversion
+        if type(data) is bytes:
+            self.body = data
+            self._is_sent = True
+            return self
+            
         if isinstance(data, dict):
             # Auto-convert dict to JSON
             return self.json(data)
@@ -96,9 +174,11 @@ class Response:
     def send_file(self, filename: str, content_type: Optional[str] = None):
         """
         Send a file
+        The file is streamed when the response is written instead of being read here
         """
-        with open(filename, 'rb') as f:
-            content = f.read()
+        # Fail inside the handler if the file is missing, like reading it would
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(f"No such file: '{filename}'")
             
         if content_type:
             self.headers['Content-Type'] = content_type
@@ -119,7 +199,7 @@ class Response:
             }
             self.headers['Content-Type'] = content_types.get(ext, 'application/octet-stream')
             
-        self.body = content
+        self.file = filename
         self._is_sent = True
         return self
     
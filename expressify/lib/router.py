@@ -1,4 +1,116 @@
-from typing import Dict, List, Callable, Any, Optional, Union, Tuple
+import re
+import sys
+from typing import Dict, List, Callable, Any, Optional, Union, Tuple, Pattern
+
+from expressify.lib.middleware import with_middleware
+
+# Canonical interned method names; request methods are mapped onto these so
+# string comparisons and route lookups short-circuit on identity
+HTTP_METHODS = {method: sys.intern(method) for method in ('GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD', 'OPTIONS')}
+
+
+class RouteNode:
+    """
+    Node in the route trie, one per path segment
+    Literal segments are looked up in a dict, ':param' and '*' segments
+    are stored as dedicated children so matching is O(path length)
+    """
+    __slots__ = ('children', 'param_children', 'wildcard_child', 'handlers')
+    
+    def __init__(self):
+        self.children: Dict[str, 'RouteNode'] = {}
+        # (compiled pattern or None, child) pairs, constrained params first
+        self.param_children: List[Tuple[Optional[Pattern], 'RouteNode']] = []
+        self.wildcard_child: Optional['RouteNode'] = None
+        # method -> (handler, parameter names in path order)
+        self.handlers: Dict[str, Tuple[Callable, List[str]]] = {}
+    
+    def insert(self, method: str, path: str, handler: Callable):
+        """Insert a route into the trie below this node"""
+        node = self
+        param_names = []
+        segments = path.split('/')
+        
+        # The wildcard swallows the rest of the path, so nothing may follow it
+        if '*' in segments[:-1]:
+            raise ValueError(f"'*' must be the last segment of a route, got '{path}'")
+        
+        for segment in segments:
+            if segment.startswith(':'):
+                # ':id(\d+)' restricts the parameter, compiled once here
+                name, _, pattern = segment[1:].partition('(')
+                param_names.append(name)
+                node = node._param_node(re.compile(pattern[:-1]) if pattern else None)
+            elif segment == '*':
+                # Wildcard swallows the rest of the path, like Express's req.params[0]
+                param_names.append('0')
+                if node.wildcard_child is None:
+                    node.wildcard_child = RouteNode()
+                node = node.wildcard_child
+                break
+            else:
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = RouteNode()
+                node = child
+        
+        # First registration wins, matching the previous linear scan
+        if method not in node.handlers:
+            node.handlers[method] = (handler, param_names)
+    
+    def _param_node(self, pattern: Optional[Pattern]) -> 'RouteNode':
+        """Get or create the parameter child for a pattern"""
+        for existing, child in self.param_children:
+            if existing == pattern:
+                return child
+                
+        child = RouteNode()
+        if pattern is None:
+            self.param_children.append((pattern, child))
+        else:
+            # Try constrained parameters before unconstrained ones
+            position = sum(1 for existing, _ in self.param_children if existing is not None)
+            self.param_children.insert(position, (pattern, child))
+        return child
+    
+    def match(self, method: str, path: str, start: int, values: List[str]):
+        """
+        Walk the trie for the segment of path beginning at start
+        Segments are located with str.find instead of splitting the whole path,
+        so a substring is only sliced for the segment being matched.
+        Literal children are preferred over parameters, parameters over wildcards
+        """
+        if start > len(path):
+            return self.handlers.get(method)
+        
+        end = path.find('/', start)
+        if end == -1:
+            end = len(path)
+        part = path[start:end]
+        
+        child = self.children.get(part)
+        if child is not None:
+            entry = child.match(method, path, end + 1, values)
+            if entry is not None:
+                return entry
+        
+        for pattern, param_child in self.param_children:
+            if pattern is not None and pattern.fullmatch(part) is None:
+                continue
+            values.append(part)
+            entry = param_child.match(method, path, end + 1, values)
+            if entry is not None:
+                return entry
+            values.pop()
+        
+        if self.wildcard_child is not None:
+            entry = self.wildcard_child.handlers.get(method)
+            if entry is not None:
+                values.append(path[start:])
+                return entry
+        
+        return None
+
 
 class Router:
     """
@@ -7,6 +119,9 @@ class Router:
     """
     def __init__(self, root_path: str = ''):
         self.routes = []
+        self.route_tree = RouteNode()
+        # (method, path) -> handler for routes without parameters
+        self.static_routes: Dict[Tuple[str, str], Callable] = {}
         self.middleware = []
         self.root_path = root_path.rstrip('/')  # Remove trailing slash for consistency
     
@@ -16,69 +131,63 @@ class Router:
         normalized_path = path if path.startswith('/') else f'/{path}'
         # Add the route with full path including root_path prefix
         full_path = f"{self.root_path}{normalized_path}"
+        # Inserted first so a rejected pattern leaves no partial registration
+        self.route_tree.insert(method, full_path, handler)
         self.routes.append((method, full_path, handler))
+        if ':' not in full_path and '*' not in full_path:
+            self.static_routes.setdefault((method, full_path), handler)
         return self
     
-    def get(self, path: str, handler: Callable = None):
-        """Route HTTP GET requests to the specified path with the specified callback functions"""
+    def _route(self, methods: List[str], path: str, handler: Any = None,
+               middleware: List[Callable] = None):
+        """
+        Register a handler for the given methods, directly or as a decorator
+        Route-specific middleware can be passed as a list, e.g. app.get('/user/:id', [validate_id])
+        """
+        # A list in place of the handler is route-specific middleware
+        if isinstance(handler, (list, tuple)):
+            middleware = list(handler) + list(middleware or [])
+            handler = None
+            
+        def register(func):
+            route_handler = with_middleware(middleware, func) if middleware else func
+            for method in methods:
+                self._add_route(method, path, route_handler)
+                
         # Support for decorator style routes
         if handler is None:
-            # Use as decorator
             def decorator(func):
-                self._add_route('GET', path, func)
+                register(func)
                 return func
             return decorator
+            
         # Use as normal method
-        return self._add_route('GET', path, handler)
+        register(handler)
+        return self
     
-    def post(self, path: str, handler: Callable = None):
+    def get(self, path: str, handler: Callable = None, middleware: List[Callable] = None):
+        """Route HTTP GET requests to the specified path with the specified callback functions"""
+        return self._route(['GET'], path, handler, middleware)
+    
+    def post(self, path: str, handler: Callable = None, middleware: List[Callable] = None):
         """Route HTTP POST requests to the specified path with the specified callback functions"""
-        if handler is None:
-            def decorator(func):
-                self._add_route('POST', path, func)
-                return func
-            return decorator
-        return self._add_route('POST', path, handler)
+        return self._route(['POST'], path, handler, middleware)
     
-    def put(self, path: str, handler: Callable = None):
+    def put(self, path: str, handler: Callable = None, middleware: List[Callable] = None):
         """Route HTTP PUT requests to the specified path with the specified callback functions"""
-        if handler is None:
-            def decorator(func):
-                self._add_route('PUT', path, func)
-                return func
-            return decorator
-        return self._add_route('PUT', path, handler)
+        return self._route(['PUT'], path, handler, middleware)
     
-    def delete(self, path: str, handler: Callable = None):
+    def delete(self, path: str, handler: Callable = None, middleware: List[Callable] = None):
         """Route HTTP DELETE requests to the specified path with the specified callback functions"""
-        if handler is None:
-            def decorator(func):
-                self._add_route('DELETE', path, func)
-                return func
-            return decorator
-        return self._add_route('DELETE', path, handler)
+        return self._route(['DELETE'], path, handler, middleware)
     
-    def patch(self, path: str, handler: Callable = None):
+    def patch(self, path: str, handler: Callable = None, middleware: List[Callable] = None):
         """Route HTTP PATCH requests to the specified path with the specified callback functions"""
-        if handler is None:
-            def decorator(func):
-                self._add_route('PATCH', path, func)
-                return func
-            return decorator
-        return self._add_route('PATCH', path, handler)
+        return self._route(['PATCH'], path, handler, middleware)
     
-    def all(self, path: str, handler: Callable = None):
+    def all(self, path: str, handler: Callable = None, middleware: List[Callable] = None):
         """Route requests of all HTTP methods to the specified path with the specified callback functions"""
-        if handler is None:
-            def decorator(func):
-                for method in ['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD', 'OPTIONS']:
-                    self._add_route(method, path, func)
-                return func
-            return decorator
-        
-        for method in ['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD', 'OPTIONS']:
-            self._add_route(method, path, handler)
-        return self
+        return self._route(list(HTTP_METHODS), path, handler, middleware)
     
     def use(self, path_or_middleware=None, middleware=None):
         """
@@ -145,34 +254,15 @@ class Router:
     
     def find_route(self, method: str, path: str) -> Tuple[Optional[Callable], Dict[str, str]]:
         """Find a matching route handler and extract URL parameters"""
-        for route_method, route_path, handler in self.routes:
-            if route_method != method:
-                continue
-                
-            # Check for exact match
-            if route_path == path:
-                return handler, {}
-                
-            # Check for parameterized routes (basic implementation)
-            route_parts = route_path.split('/')
-            path_parts = path.split('/')
+        # Fully static routes are a single dict lookup
+        handler = self.static_routes.get((method, path))
+        if handler is not None:
+            return handler, {}
             
-            if len(route_parts) != len(path_parts):
-                continue
-                
-            params = {}
-            match = True
+        values = []
+        entry = self.route_tree.match(method, path, 0, values)
+        if entry is None:
+            return None, {}
             
-            for route_part, path_part in zip(route_parts, path_parts):
-                if route_part.startswith(':'):
-                    # This is a parameter
-                    param_name = route_part[1:]
-                    params[param_name] = path_part
-                elif route_part != path_part:
-                    match = False
-                    break
-                    
-            if match:
-                return handler, params
-                
-        return None, {} 
\ No newline at end of file
+        handler, param_names = entry
+        return handler, dict(zip(param_names, values))
@@ -48,6 +48,11 @@ setup(
         'uvicorn>=0.15.0',
     ],
     extras_require={
+        'speedups': [
+            'orjson>=3.6.0',
+            'uvloop>=0.14.0; sys_platform != "win32"',
+            'httptools>=0.6.1',
+        ],
         'dev': [
             'pytest>=6.0.0',
             'black>=21.5b2',
@@ -1,4 +1,5 @@
 import pytest  # noqa
+import asyncio
 import json
 from unittest.mock import MagicMock, patch
 
@@ -6,6 +7,21 @@ from unittest.mock import MagicMock, patch
 from expressify import expressify
 
 
+def run_asgi(app, method, path, headers=None):
+    """Run one request through the app's ASGI interface and return the sent messages."""
+    sent = []
+    
+    async def receive():
+        return {'body': b'', 'more_body': False}
+    
+    async def send(message):
+        sent.append(message)
+    
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': headers or []}
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
 def test_expressify_instance():
     """Test the creation of an expressify application instance."""
     app = expressify()
@@ -153,4 +169,242 @@ def test_status_code_setting():
     
     # Check that res.status and res.json were called with the expected arguments
     res.status.assert_called_once_with(201)
-    res.json.assert_called_once_with({'message': 'Created'}) 
\ No newline at end of file
+    res.json.assert_called_once_with({'message': 'Created'}) 
+
+def test_find_route_prefers_literal_segments():
+    """Test that literal segments win over parameters and parameters backtrack."""
+    app = expressify()
+    
+    def by_id(req, res):
+        pass
+    
+    def me(req, res):
+        pass
+    
+    def by_id_posts(req, res):
+        pass
+    
+    app.get('/users/:id', by_id)
+    app.get('/users/me', me)
+    app.get('/users/:id/posts', by_id_posts)
+    
+    assert app.find_route('GET', '/users/42') == (by_id, {'id': '42'})
+    assert app.find_route('GET', '/users/me') == (me, {})
+    assert app.find_route('GET', '/users/me/posts') == (by_id_posts, {'id': 'me'})
+    assert app.find_route('POST', '/users/42') == (None, {})
+    assert app.find_route('GET', '/missing') == (None, {})
+
+
+def test_find_route_mounted_router_and_wildcard():
+    """Test matching routes mounted from a Router and wildcard segments."""
+    from expressify import Router
+    
+    app = expressify()
+    api = Router()
+    
+    def get_user(req, res):
+        pass
+    
+    def get_file(req, res):
+        pass
+    
+    api.get('/users/:id', get_user)
+    app.use('/api', api)
+    app.get('/files/*', get_file)
+    
+    assert app.find_route('GET', '/api/users/7') == (get_user, {'id': '7'})
+    assert app.find_route('GET', '/files/css/site.css') == (get_file, {'0': 'css/site.css'})
+
+
+def test_wildcard_must_end_the_route():
+    """Test that a '*' followed by more segments is rejected instead of truncated."""
+    app = expressify()
+    
+    with pytest.raises(ValueError):
+        app.get('/a/*/b', lambda req, res: None)
+    
+    assert app.routes == []
+
+
+def test_find_route_parameter_patterns():
+    """Test parameters restricted with a regular expression pattern."""
+    app = expressify()
+    
+    def by_number(req, res):
+        pass
+    
+    def by_slug(req, res):
+        pass
+    
+    app.get('/posts/:slug', by_slug)
+    app.get(r'/posts/:id(\d+)', by_number)
+    
+    assert app.find_route('GET', '/posts/12') == (by_number, {'id': '12'})
+    assert app.find_route('GET', '/posts/hello') == (by_slug, {'slug': 'hello'})
+
+
+def test_global_and_route_middleware_order():
+    """Test that app-level middleware runs before route-specific middleware."""
+    app = expressify()
+    calls = []
+    
+    async def global_middleware(req, res, next):
+        calls.append('global')
+        await next()
+    
+    def route_middleware(req, res, next):
+        calls.append('route')
+        return next()
+    
+    app.use(global_middleware)
+    
+    @app.get('/items/:id', [route_middleware])
+    def get_item(req, res):
+        calls.append('handler')
+        res.send(req.params['id'])
+    
+    sent = run_asgi(app, 'GET', '/items/7')
+    
+    assert calls == ['global', 'route', 'handler']
+    assert sent[0]['status'] == 200
+    assert sent[1]['body'] == b'7'
+
+
+def test_send_file_streams_in_chunks(tmp_path):
+    """Test that res.send_file() streams the file with its full Content-Length."""
+    from expressify.lib.application import FILE_CHUNK_SIZE
+    
+    data = b'x' * (FILE_CHUNK_SIZE + 10)
+    file_path = tmp_path / 'data.bin'
+    file_path.write_bytes(data)
+    
+    app = expressify()
+    
+    @app.get('/download')
+    def download(req, res):
+        res.send_file(str(file_path))
+    
+    sent = run_asgi(app, 'GET', '/download')
+    
+    assert [b'content-length', str(len(data)).encode()] in sent[0]['headers']
+    assert [message['more_body'] for message in sent[1:]] == [True, False]
+    assert b''.join(message['body'] for message in sent[1:]) == data
+
+
+def test_common_header_names_are_interned():
+    """Test that common request header names are stored as interned strings."""
+    import sys
+    
+    app = expressify()
+    seen = {}
+    
+    @app.get('/')
+    def index(req, res):
+        seen.update(req.headers)
+        res.send('ok')
+    
+    run_asgi(app, 'GET', '/', [(b'user-agent', b'pytest'), (b'x-custom', b'1')])
+    
+    name = next(key for key in seen if key == 'user-agent')
+    assert name is sys.intern('user-agent')
+    assert seen == {'user-agent': 'pytest', 'x-custom': '1'}
+
+
+def test_fixed_response_with_and_without_middleware():
+    """Test that app.fixed() sends its prebuilt response, also through middleware."""
+    app = expressify()
+    app.fixed('/text', 200, [('Content-Type', 'text/plain')], b'fixed body')
+    
+    fast = run_asgi(app, 'GET', '/text')
+    assert fast[0]['status'] == 200
+    assert [b'content-length', b'10'] in fast[0]['headers']
+    assert fast[1]['body'] == b'fixed body'
+    
+    calls = []
+    
+    def logger(req, res, next):
+        calls.append(req.path)
+        return next()
+    
+    app.use(logger)
+    routed = run_asgi(app, 'GET', '/text')
+    
+    assert calls == ['/text']
+    assert routed[0]['headers'] == fast[0]['headers']
+    assert routed[1]['body'] == b'fixed body'
+
+
+def test_header_values_are_decoded_as_utf8():
+    """Test that non-ASCII request header values reach handlers intact."""
+    app = expressify()
+    seen = {}
+    
+    @app.get('/')
+    def index(req, res):
+        seen.update(req.headers)
+        res.send('ok')
+    
+    run_asgi(app, 'GET', '/', [(b'x-user-name', 'Zoë'.encode('utf-8'))])
+    
+    assert seen['x-user-name'] == 'Zoë'
+
+
+def test_retained_response_is_not_reused():
+    """Test that a res kept by a handler is not handed to a later request."""
+    app = expressify()
+    kept = []
+    
+    @app.get('/items/:id')
+    def get_item(req, res):
+        kept.append(res)
+        res.status(201).send(req.params['id'])
+    
+    run_asgi(app, 'GET', '/items/1')
+    run_asgi(app, 'GET', '/items/2')
+    
+    assert kept[0] is not kept[1]
+    assert kept[0].status_code == 201
+    assert kept[0].body == b'1'
+
+
+def test_path_middleware_and_not_found():
+    """Test that path-specific middleware is skipped elsewhere and unmatched paths get a 404."""
+    app = expressify()
+    calls = []
+    
+    def api_only(req, res, next):
+        calls.append('api')
+        return next()
+    
+    async def everywhere(req, res, next):
+        calls.append(req.path)
+        await next()
+    
+    app.use('/api', api_only)
+    app.use(everywhere)
+    
+    sent = run_asgi(app, 'GET', '/missing')
+    
+    assert calls == ['/missing']
+    assert sent[0]['status'] == 404
+    assert sent[1]['body'] == b'Cannot GET /missing'
+
+
+def test_not_modified_has_no_content_length():
+    """Test that 304 and 204 responses are sent without a computed Content-Length."""
+    app = expressify()
+    
+    @app.get('/page')
+    def page(req, res):
+        res.type('text/html').status(304).send(b'')
+    
+    @app.delete('/items/1')
+    def delete_item(req, res):
+        res.status(204).send('ignored')
+    
+    not_modified = run_asgi(app, 'GET', '/page')
+    no_content = run_asgi(app, 'DELETE', '/items/1')
+    
+    assert not_modified[0]['headers'] == [[b'Content-Type', b'text/html']]
+    assert no_content[0]['headers'] == [[b'Content-Type', b'text/plain']]
+    assert no_content[1]['body'] == b''
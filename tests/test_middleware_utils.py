@@ -0,0 +1,140 @@
+import pytest  # noqa
+import importlib.util
+import os
+
+# Import expressify components
+from expressify.lib.request import Request
+from expressify.lib.response import Response
+
+# The middleware utilities ship with the middleware example rather than the package
+MIDDLEWARE_UTILS_PATH = os.path.join(os.path.dirname(__file__), '..', 'examples',
+                                     '03-middleware', 'middleware_utils.py')
+spec = importlib.util.spec_from_file_location('middleware_utils', MIDDLEWARE_UTILS_PATH)
+middleware_utils = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(middleware_utils)
+
+
+def run_middleware(middleware, path='/', headers=None):
+    """Run one middleware for a GET request and return the response and whether next() was called."""
+    req = Request('GET', path, {}, {}, headers or {})
+    res = Response()
+    called = []
+    middleware(req, res, lambda: called.append(True))
+    return res, bool(called)
+
+
+class TestStaticFiles:
+    """Tests for the static_files cache."""
+    
+    def test_cache_hit_reuses_entry(self, tmp_path):
+        """Test that a second request is served from the cached entry."""
+        (tmp_path / 'site.css').write_bytes(b'body {}')
+        middleware = middleware_utils.static_files(str(tmp_path))
+        
+        first, _ = run_middleware(middleware, '/static/site.css')
+        second, _ = run_middleware(middleware, '/static/site.css')
+        
+        assert second.body == b'body {}'
+        assert second.headers['Content-Type'] == 'text/css'
+        assert second.static_file is first.static_file
+    
+    def test_changed_mtime_rereads_file(self, tmp_path):
+        """Test that a file modified on disk is read again."""
+        file_path = tmp_path / 'app.js'
+        file_path.write_bytes(b'old')
+        middleware = middleware_utils.static_files(str(tmp_path))
+        run_middleware(middleware, '/static/app.js')
+        
+        file_path.write_bytes(b'new')
+        st = os.stat(file_path)
+        os.utime(file_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        res, _ = run_middleware(middleware, '/static/app.js')
+        
+        assert res.body == b'new'
+    
+    def test_large_files_are_streamed(self, tmp_path, monkeypatch):
+        """Test that files over the size cutoff go to send_file() and are not cached."""
+        monkeypatch.setattr(middleware_utils, 'STATIC_CACHE_MAX_FILE_SIZE', 4)
+        (tmp_path / 'big.txt').write_bytes(b'0123456789')
+        middleware = middleware_utils.static_files(str(tmp_path), preload=False)
+        
+        res, _ = run_middleware(middleware, '/static/big.txt')
+        
+        assert res.file == str(tmp_path / 'big.txt')
+        assert res.body is None
+        assert not hasattr(res, 'static_file')
+    
+    def test_compression_shares_cached_gzip(self, tmp_path):
+        """Test that compression() gzips a cached static file once."""
+        (tmp_path / 'page.html').write_bytes(b'<p>hello</p>' * 200)
+        static = middleware_utils.static_files(str(tmp_path))
+        compress = middleware_utils.compression()
+        headers = {'accept-encoding': 'gzip'}
+        
+        def request():
+            req = Request('GET', '/static/page.html', {}, {}, headers)
+            res = Response()
+            compress(req, res, lambda: static(req, res, lambda: None))
+            return res
+        
+        first = request()
+        second = request()
+        
+        assert first.headers['Content-Encoding'] == 'gzip'
+        assert second.body is first.body
+        assert first.static_file[3] is first.body
+
+
+class TestRateLimiter:
+    """Tests for the rate_limiter token buckets."""
+    
+    def test_rejects_when_tokens_run_out(self):
+        """Test that a client gets a 429 once its tokens are used up."""
+        middleware = middleware_utils.rate_limiter(max_requests=2, window_seconds=3600)
+        headers = {'x-forwarded-for': '10.0.0.1'}
+        
+        results = [run_middleware(middleware, headers=headers) for _ in range(3)]
+        
+        assert [called for _, called in results] == [True, True, False]
+        assert results[1][0].headers['X-RateLimit-Remaining'] == '0'
+        assert results[2][0].status_code == 429
+    
+    def test_full_shard_evicts_least_recent_client(self, monkeypatch):
+        """Test that a full shard forgets its least recently seen client."""
+        shards = middleware_utils.RATE_LIMIT_SHARDS
+        monkeypatch.setattr(middleware_utils, 'RATE_LIMIT_MAX_CLIENTS', shards * 2)
+        middleware = middleware_utils.rate_limiter(max_requests=1, window_seconds=3600)
+        
+        # Three clients that land in the same two-client shard
+        mask = shards - 1
+        ips = [f'10.0.0.{i}' for i in range(256)]
+        target = hash(ips[0]) & mask
+        first, second, third = [ip for ip in ips if hash(ip) & mask == target][:3]
+        
+        def allowed(ip):
+            return run_middleware(middleware, headers={'x-forwarded-for': ip})[1]
+        
+        assert allowed(first)
+        assert not allowed(first)
+        assert allowed(second)
+        assert allowed(third)
+        # first was evicted, so it starts again with a full bucket
+        assert allowed(first)
+
+
+class TestValidateRequest:
+    """Tests for validate_request."""
+    
+    def test_malformed_json_body_is_a_validation_error(self):
+        """Test that an unparseable JSON body gets a 400 instead of raising."""
+        middleware = middleware_utils.validate_request({'body': {'name': {'required': True}}})
+        req = Request('POST', '/users', {}, {}, {'content-type': 'application/json'},
+                      raw_body=b'{invalid')
+        res = Response()
+        called = []
+        
+        middleware(req, res, lambda: called.append(True))
+        
+        assert not called
+        assert res.status_code == 400
+        assert b'Request body is not valid JSON' in res.body
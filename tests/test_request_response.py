@@ -148,4 +148,90 @@ class TestResponse:
             mock_redirect.assert_called_once_with('/other-page')
             
             # Verify the response
-            assert result == 'REDIRECT_RESPONSE' 
\ No newline at end of file
+            assert result == 'REDIRECT_RESPONSE' 
+
+class TestRequestBody:
+    """Tests for lazy request body parsing."""
+    
+    def test_json_body_parsed_on_access(self):
+        """Test that JSON bodies are parsed from raw bytes on first access."""
+        request = Request('POST', '/items', {}, {}, {'content-type': 'application/json'},
+                          raw_body=b'{"key": "value"}')
+        
+        assert request.json == {'key': 'value'}
+        assert request.body == {'key': 'value'}
+    
+    def test_form_body_parsed_on_access(self):
+        """Test that urlencoded bodies are parsed from raw bytes."""
+        request = Request('POST', '/form', {}, {},
+                          {'content-type': 'application/x-www-form-urlencoded'},
+                          raw_body=b'name=test')
+        
+        assert request.json is None
+        assert request.body == {'name': ['test']}
+    
+    def test_invalid_json_body(self):
+        """Test that invalid JSON falls back to text for body and raises for json."""
+        request = Request('POST', '/items', {}, {}, {'content-type': 'application/json'},
+                          raw_body=b'{invalid')
+        
+        assert request.body == '{invalid'
+        with pytest.raises(ValueError):
+            request.json
+
+
+class TestResponseHeaders:
+    """Tests for encoding response headers."""
+    
+    def test_raw_headers_expand_appended_values(self):
+        """Test that appended headers are sent as separate lines with a content length."""
+        response = Response()
+        response.cookie('a', '1').cookie('b', '2')
+        
+        assert response.raw_headers(3) == [
+            [b'Content-Type', b'text/plain'],
+            [b'Set-Cookie', b'a=1; Path=/'],
+            [b'Set-Cookie', b'b=2; Path=/'],
+            [b'content-length', b'3'],
+        ]
+    
+    def test_raw_headers_keep_handler_content_length(self):
+        """Test that a Content-Length set by the handler is not sent twice."""
+        response = Response()
+        response.set('content-Length', '42')
+        
+        assert response.raw_headers(0) == [
+            [b'Content-Type', b'text/plain'],
+            [b'content-Length', b'42'],
+        ]
+    
+    def test_raw_headers_encode_non_string_values(self):
+        """Test that header values such as ints are sent as text."""
+        response = Response()
+        response.set('X-Count', 3).append('X-Ids', 1).append('X-Ids', 2)
+        
+        assert response.raw_headers(5) == [
+            [b'Content-Type', b'text/plain'],
+            [b'X-Count', b'3'],
+            [b'X-Ids', b'1'],
+            [b'X-Ids', b'2'],
+            [b'content-length', b'5'],
+        ]
+
+
+class TestResponseJson:
+    """Tests for JSON response encoding."""
+    
+    def test_json_with_non_string_keys(self):
+        """Test that res.json() encodes non-string keys like json.dumps does."""
+        response = Response()
+        response.json({'headers': {'host': 'example.com'}, 'counts': {1: 'one'}})
+        
+        assert json.loads(response.body) == {'headers': {'host': 'example.com'}, 'counts': {'1': 'one'}}
+    
+    def test_json_with_integers_beyond_64_bits(self):
+        """Test that values orjson rejects are still encoded like json.dumps does."""
+        response = Response()
+        response.json({'n': 2 ** 70, 'counts': {1: 2 ** 70}})
+        
+        assert json.loads(response.body) == {'n': 2 ** 70, 'counts': {'1': 2 ** 70}}